@@ -1,9 +1,32 @@
+import os
+import json
+import time
+import threading
 import mido as md
 import tkinter as tk
 from tkinter import ttk
-import threading
+import multiprocessing as mp
 from PIL import ImageTk, Image
+from helix_realtime import enter_realtime
+from helix_status import StatusBoard, format_status, open_board
+from helix_controllers import ControllerThinner
+from helix_profiler import SamplingProfiler
+from helix_recorder import (FlightRecorder, REC_IN, REC_OUT, REC_VOICE,
+                            REC_STEAL, REC_RELEASE, REC_BYPASS, REC_PRESET,
+                            REC_STOP, REC_RESYNC, STOP_REASONS)
+from helix_ports import RtMidiInport, SerialOutport, UdpInport, parse_address
+
+
+
+#############################################################################
+############### - CC VALUE TABLES - #########################################
+#############################################################################
 
+# CC values that select octave 0,...,8 and note C,...,B on the 3NG. The Helix
+# maps a CC value v onto step v*len(list)//128, so these are the values that
+# land on each step.
+olist = [0,16,32,48,64,80,96,112,127]
+nlist = [0,12,24,35,47,59,70,81,93,104,116,127]
 
 
 #############################################################################
@@ -13,7 +36,7 @@ from PIL import ImageTk, Image
 class HelixOscillator:
     def __init__(self, cc_shape, cc_oct, cc_note, cc_level, cc_glide, 
                  note=0, octave=0, volume=0, glide=0, shape=0, midi_note=0,
-                 channel=0, monopoly="poly"):
+                 channel=0, monopoly="poly", bend=0):
         self.cc_note    = cc_note
         self.cc_oct     = cc_oct
         self.cc_shape   = cc_shape
@@ -27,11 +50,14 @@ class HelixOscillator:
         self.midi_note  = midi_note
         self.channel    = channel
         self.monopoly   = monopoly
+        self.bend       = bend
 
         
     def set_note(self, input_note):
         """
-        Sets the note and octave of the oscillator.
+        Sets the note and octave of the oscillator, transposed by the
+        current pitch bend. The 3NG only covers octaves 0 to 8, so higher
+        notes are played as the highest note it has.
 
         Parameters
         ----------
@@ -43,8 +69,27 @@ class HelixOscillator:
         None.
 
         """
-        self.octave   = input_note//12
-        self.note     = input_note - self.octave*12
+        self.midi_note = input_note
+        pitch = min(max(input_note + self.bend, 0), len(olist)*12 - 1)
+        self.octave   = pitch//12
+        self.note     = pitch - self.octave*12
+        
+    def set_bend(self, semitones):
+        """
+        Transposes the oscillator against its MIDI note (pitch bend).
+
+        Parameters
+        ----------
+        semitones : int
+            Transposition in semitones.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.bend = semitones
+        self.set_note(self.midi_note)
         
     def update_oscillator(self, msg):
         """
@@ -61,10 +106,8 @@ class HelixOscillator:
 
         """
         if msg.type == 'note_on':
-            self.octave     = msg.note // 12
-            self.note       = msg.note - self.octave * 12
+            self.set_note(msg.note)
             self.volume     = max(20, msg.velocity)
-            self.midi_note  = msg.note
         else:
             print("Message is not NOTE ON. Doing nothing.")
               
@@ -79,9 +122,6 @@ class HelixOscillator:
             MIDO MIDI messages that are to be sent to the Helix.
 
         """
-        olist = [0,16,32,48,64,80,96,112,127]
-        nlist = [0,12,24,35,47,59,70,81,93,104,116,127]
-        
 
         # msg_shp = md.Message('control_change', 
         #                                channel = self.channel, 
@@ -159,6 +199,965 @@ class HelixOscillator:
             print("Shape: "+shape+" is not a valid shape. Revert to sine...\n")
 
 
+class HelixPreset:
+    """
+    One setup of the adapter that can be selected with a Program Change:
+    mode, intervals, waveshape, glide and the CC parameters of the 3NG.
+
+    Everything is checked and turned into CC VALUES when the preset is
+    created, so that HelixEngine only has to take over a few references on
+    a switch and send the CCs that differ from what the Helix already has.
+    Shape and glide that are None are left as they are on the Helix.
+
+    A preset in chord mode carries its own ChordMemory, compiled from the
+    voicings in chords (see ChordMemory) with [0, interval1, interval2] as
+    the default voicing.
+    """
+    def __init__(self, name            = "",
+                 mode            = "poly",
+                 interval1       = 0,
+                 interval2       = 0,
+                 ccshapes        = [80,85,90],
+                 ccocts          = [81,86,91],
+                 ccnotes         = [82,87,92],
+                 cclevels        = [83,88,93],
+                 ccglides        = [84,89,94],
+                 cc_bypass       = 77,
+                 shape           = None,
+                 glide           = None,
+                 chords          = None,
+                 chord_scope     = "all"
+                 ):
+        if mode not in ["poly", "mono", "chord"]:
+            raise ValueError("Preset {!r} has unknown mode {!r}.".format(name, mode))
+        if chords is not None and mode != "chord":
+            raise ValueError("Preset {!r} has voicings but is not in chord mode.".format(name))
+        if shape is not None and shape not in ["saw_up", "saw_down", "triangle",
+                                               "sine", "square"]:
+            raise ValueError("Preset {!r} has unknown shape {!r}.".format(name, shape))
+        cclists = [ccshapes, ccocts, ccnotes, cclevels, ccglides]
+        if any(len(l) != 3 for l in cclists):
+            raise ValueError("Preset {!r} needs three CC parameters per oscillator value.".format(name))
+        for value in sum(cclists, [cc_bypass] + ([] if glide is None else [glide])):
+            if not 0 <= value <= 127:
+                raise ValueError("Preset {!r} has the invalid CC parameter/VALUE {!r}.".format(name, value))
+        
+        self.name           = name
+        self.mode           = mode
+        self.interval1      = interval1
+        self.interval2      = interval2
+        self.cc_bypass      = cc_bypass
+        self.shape          = None if shape is None else wave_to_cc(shape)
+        self.glide          = glide
+        if mode != "chord":
+            self.chords     = None
+        elif isinstance(chords, ChordMemory):
+            self.chords     = chords
+        else:
+            self.chords     = ChordMemory(chords, (0, interval1, interval2), chord_scope)
+        # CC parameters per oscillator: (shape, octave, note, level, glide).
+        self.voices         = tuple(zip(ccshapes, ccocts, ccnotes, cclevels, ccglides))
+        # (CC parameter, VALUE) of the settings sent once on selection.
+        setup = []
+        for cc_shape, cc_oct, cc_note, cc_level, cc_glide in self.voices:
+            if self.shape is not None:
+                setup.append((cc_shape, self.shape))
+            if glide is not None:
+                setup.append((cc_glide, glide))
+        self.setup          = tuple(setup)
+
+
+class HeldNotes:
+    """
+    The keys that are held down: a 128-bit bitmap (an int) for the lowest
+    and highest key, and the keys with their velocity in the order they
+    were pressed (a dict, oldest first) for the most recent ones. Pressing,
+    releasing and picking the voices cost the same for any number of keys.
+    """
+    def __init__(self):
+        self.bits   = 0
+        self.order  = {}
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def __contains__(self, note):
+        return self.bits >> note & 1 == 1
+    
+    def press(self, note, velocity):
+        """
+        Adds a key, or makes a held key the most recent one.
+
+        Parameters
+        ----------
+        note : int
+            MIDI note VALUE (0,...,127).
+        velocity : int
+            Velocity of the key.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.bits >> note & 1:
+            del self.order[note]
+        self.bits |= 1 << note
+        self.order[note] = velocity
+    
+    def release(self, note):
+        """
+        Removes a key.
+
+        Parameters
+        ----------
+        note : int
+            MIDI note VALUE (0,...,127).
+
+        Returns
+        -------
+        bool
+            Whether the key was held.
+
+        """
+        if not self.bits >> note & 1:
+            return False
+        self.bits &= ~(1 << note)
+        del self.order[note]
+        return True
+    
+    def clear(self):
+        """
+        Forgets all keys.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.bits = 0
+        self.order.clear()
+    
+    def lowest(self):
+        return (self.bits & -self.bits).bit_length() - 1
+    
+    def highest(self):
+        return self.bits.bit_length() - 1
+    
+    def pick(self, voices):
+        """
+        Chooses the keys that get one of the three oscillators: all of them
+        if up to three keys are held, otherwise the lowest, the highest and
+        the most recent of the others. A chord thus never loses its bass or
+        top note, and the key just pressed is heard.
+
+        Parameters
+        ----------
+        voices : list of int
+            List of length 3 that receives the chosen keys, -1 for none.
+
+        Returns
+        -------
+        None.
+
+        """
+        if len(self.order) <= 3:
+            i = 0
+            for note in self.order:
+                voices[i] = note
+                i += 1
+            while i < 3:
+                voices[i] = -1
+                i += 1
+            return
+        low     = self.lowest()
+        high    = self.highest()
+        voices[0] = low
+        voices[1] = high
+        for note in reversed(self.order):
+            if note != low and note != high:
+                voices[2] = note
+                return
+
+
+class ChordMemory:
+    """
+    Voicings for the chord mode: for every key, the three notes the
+    oscillators play, as intervals above the key, e.g. [0, 4, 7] for a major
+    triad.
+
+    A voicing can be stored for a single key (MIDI note VALUE), for a
+    scale degree (note name "C",...,"B", any octave) or for all keys ("*").
+    The most specific one wins; keys without any play the default.
+
+    All voicings are compiled into a table of 128 x 3 entries holding the
+    pitch and the ready-to-send octave and note CC VALUES per key and
+    oscillator, so a key press is a table lookup. Notes outside the 3NG's
+    range play the key itself, like the intervals of the mono synth.
+    """
+    NAMES = ["C","C#","D","D#","E","F","F#","G","G#","A","A#","B"]
+    
+    def __init__(self, chords=None, default=(0, 0, 0), scope="all"):
+        if scope not in ["all", "degree", "key"]:
+            raise ValueError("Unknown chord scope {!r}.".format(scope))
+        self.scope      = scope
+        self.default    = self._voicing(default)
+        self.every      = None
+        self.degrees    = [None] * 12
+        self.keys       = {}
+        self.pitches    = bytearray(128 * 3)
+        self.octs       = bytearray(128 * 3)
+        self.notes      = bytearray(128 * 3)
+        if chords is not None:
+            for key, intervals in chords.items():
+                self.set(key, intervals)
+        self.compile()
+    
+    def _voicing(self, intervals):
+        intervals = [int(i) for i in intervals]
+        if not 1 <= len(intervals) <= 3:
+            raise ValueError("A voicing has one to three notes, not {!r}.".format(intervals))
+        # Missing notes double the lowest one.
+        return tuple(intervals + [intervals[0]] * (3 - len(intervals)))
+    
+    def set(self, key, intervals):
+        """
+        Stores a voicing. Call compile() afterwards.
+
+        Parameters
+        ----------
+        key : int or string
+            MIDI note VALUE of a single key (also as a string), a note name
+            "C",...,"B" for a scale degree, or "*" for all keys.
+        intervals : list of int
+            One to three intervals in semitones above the key.
+
+        Returns
+        -------
+        None.
+
+        """
+        voicing = self._voicing(intervals)
+        if key == "*":
+            self.every = voicing
+        elif key in self.NAMES:
+            self.degrees[self.NAMES.index(key)] = voicing
+        else:
+            try:
+                note = int(key)
+            except ValueError:
+                note = -1
+            if not 0 <= note <= 127:
+                raise ValueError("Invalid key {!r} for a voicing.".format(key))
+            self.keys[note] = voicing
+    
+    def chord(self, note):
+        """
+        The voicing that applies to a key.
+
+        Parameters
+        ----------
+        note : int
+            MIDI note VALUE.
+
+        Returns
+        -------
+        tuple of int
+            Three intervals.
+
+        """
+        voicing = self.keys.get(note)
+        if voicing is None:
+            voicing = self.degrees[note % 12]
+        if voicing is None:
+            voicing = self.every
+        if voicing is None:
+            voicing = self.default
+        return voicing
+    
+    def compile(self):
+        """
+        Builds the table of all keys from the stored voicings.
+
+        Returns
+        -------
+        None.
+
+        """
+        top = len(olist)*12 - 1
+        for note in range(128):
+            voicing = self.chord(note)
+            for i in [0,1,2]:
+                pitch = note + voicing[i]
+                if pitch < 0 or pitch > 127:
+                    pitch = note
+                pitch = min(pitch, top)
+                j = note*3 + i
+                self.pitches[j] = pitch
+                self.octs[j]    = olist[pitch // 12]
+                self.notes[j]   = nlist[pitch % 12]
+    
+    def learn(self, held):
+        """
+        Stores the held keys as a voicing, with the lowest key as root:
+        for that key, its scale degree or all keys, depending on the scope.
+        With scope "all", voicings stored before are dropped.
+
+        Parameters
+        ----------
+        held : list of int
+            MIDI note VALUES of up to three held keys.
+
+        Returns
+        -------
+        root : int
+            The key the voicing was stored for.
+        voicing : tuple of int
+            The stored intervals.
+
+        """
+        held = sorted(n for n in held if n >= 0)
+        root = held[0]
+        voicing = self._voicing([n - root for n in held])
+        if self.scope == "key":
+            self.keys[root] = voicing
+        elif self.scope == "degree":
+            self.degrees[root % 12] = voicing
+        else:
+            self.every = voicing
+            self.degrees = [None] * 12
+            self.keys = {}
+        self.compile()
+        return root, voicing
+
+
+class HelixEngine:
+    """
+    The adapter logic without ports: MIDI bytes in, encoded CC bytes for
+    the Helix out. helix_polysynth() and helix_monosynth() are loops around
+    it; it can as well be embedded into another host process.
+
+    Every call returns the CCs that change the 3NG, as a memoryview of
+    complete 3-byte CC messages. Parameters that already have the value on
+    the Helix are not sent again. The memoryview points into a buffer owned
+    by the engine and is only valid until the next call, so send or copy it
+    right away.
+
+    The engine keeps all state in objects created up front, so process()
+    does not create new objects per call.
+
+    In poly mode, any number of keys can be held. The three oscillators
+    play the keys chosen by HeldNotes.pick(); a voice only moves to another
+    key if its own key is not chosen anymore, and a key that gets chosen
+    again (e.g. the highest one after the top note was released) sounds
+    again.
+
+    With presets, a Program Change switches to the HelixPreset of that
+    program number. Voices keep sounding if the mode and the CC parameters
+    stay the same, otherwise they are silenced first.
+
+    With a FlightRecorder, the engine records the incoming messages, the
+    CCs it sends and its decisions (voice picks and steals, bypass, preset
+    switches). The CC cc_panic silences all voices and asks the recorder
+    for a dump. The CC cc_profile asks the SamplingProfiler to start or
+    stop.
+
+    In chord mode, every key plays the voicing of a ChordMemory on the
+    three oscillators. Holding a chord and sending the CC cc_learn stores
+    it. Otherwise the chord mode behaves like the mono mode.
+
+    A snapshot or preset change on the Helix can reset the 3NG. On the CC
+    cc_snapshot (and with program_resync on any Program Change), the
+    engine sends the parameters it owns again through tick(): one
+    oscillator per resync_interval seconds, starting resync_delay seconds
+    later, so the Helix has loaded the snapshot before and the resync does
+    not block the notes. Messages arriving meanwhile only send what they
+    change, as usual; each resync step sends its parameters whatever the
+    engine believes the Helix has. helix_message() handles the messages of
+    the Helix's own port, which only start resyncs.
+    """
+    OUT_SIZE = 64*3
+    
+    def __init__(self, mode            = "poly",
+                 interval1       = 0,
+                 interval2       = 0,
+                 midi_channel    = 0,
+                 ccshapes        = [80,85,90],
+                 ccocts          = [81,86,91],
+                 ccnotes         = [82,87,92],
+                 cclevels        = [83,88,93],
+                 ccglides        = [84,89,94],
+                 cc_bypass       = 77,
+                 cc_off          = 18,
+                 shape           = None,
+                 glide           = None,
+                 bend_range      = 0,
+                 aftertouch      = "",
+                 modwheel        = "",
+                 cc_modwheel     = 1,
+                 thinning        = None,
+                 presets         = None,
+                 program         = None,
+                 recorder        = None,
+                 cc_panic        = None,
+                 profiler        = None,
+                 cc_profile      = None,
+                 cc_snapshot     = None,
+                 program_resync  = False,
+                 resync_delay    = 0.01,
+                 resync_interval = 0.001,
+                 chords          = None,
+                 chord_scope     = "all",
+                 cc_learn        = None
+                 ):
+        self.mode           = mode
+        self.interval1      = interval1
+        self.interval2      = interval2
+        self.channel        = midi_channel
+        self.cc_bypass      = cc_bypass
+        self.cc_off         = cc_off
+        self.cc_panic       = cc_panic
+        self.recorder       = recorder
+        self.cc_profile     = cc_profile
+        self.profiler       = profiler
+        self.cc_snapshot    = cc_snapshot
+        self.program_resync = program_resync
+        self.resync_delay   = resync_delay
+        self.resync_interval = resync_interval
+        self.resyncing      = False
+        self._resync_step   = 0
+        self._resync_at     = None
+        if isinstance(chords, ChordMemory):
+            self.chords     = chords
+        else:
+            self.chords     = ChordMemory(chords, (0, interval1, interval2), chord_scope)
+        self.cc_learn       = cc_learn
+        self.shape          = None if shape is None else wave_to_cc(shape)
+        self.glide          = glide
+        self.bend_range     = bend_range
+        self.aftertouch     = aftertouch
+        self.modwheel       = modwheel
+        self.cc_modwheel    = cc_modwheel
+        self.thinner        = ControllerThinner(thinning)
+        self.oscillators    = [HelixOscillator(ccshapes[o],
+                                               ccocts[o],
+                                               ccnotes[o],
+                                               cclevels[o],
+                                               ccglides[o],
+                                               glide    = 0 if glide is None else glide,
+                                               channel  = midi_channel,
+                                               monopoly = mode
+                                               ) for o in [0,1,2]]
+        self._map           = tuple(zip(ccshapes, ccocts, ccnotes, cclevels, ccglides))
+        self.presets        = {} if presets is None else dict(presets)
+        self.preset         = None
+        self.program        = None
+        
+        self.running        = True
+        self.stop_reason    = ""
+        self.bypass         = mode == "poly"
+        self.keycounter     = 0
+        self.held           = HeldNotes()
+        self._voices        = [-1, -1, -1]
+        self.rotation       = -1
+        self.last_note      = 0
+        self.last_time      = 0.0
+        
+        # Output buffer, one view per possible length, and the last value
+        # sent for each CC parameter (255: unknown).
+        self._status        = 0xB0 | midi_channel
+        self._n             = 0
+        self.out            = bytearray(self.OUT_SIZE)
+        view                = memoryview(self.out)
+        self._views         = [view[:n] for n in range(self.OUT_SIZE + 1)]
+        self._sent          = bytearray(b"\xff" * 128)
+        
+        if program is not None:
+            self.select_preset(program)
+    
+    def _emit(self, cc, value):
+        if self._sent[cc] != value:
+            self._sent[cc] = value
+            if self.recorder is not None:
+                self.recorder.record(REC_OUT, cc, value)
+            n = self._n
+            self.out[n]     = self._status
+            self.out[n + 1] = cc
+            self.out[n + 2] = value
+            self._n = n + 3
+    
+    def _emit_voice(self, o):
+        self._emit(o.cc_oct, olist[o.octave])
+        self._emit(o.cc_note, nlist[o.note])
+        self._emit(o.cc_level, o.volume)
+    
+    def _emit_voices(self):
+        for o in self.oscillators:
+            self._emit_voice(o)
+    
+    def _emit_bypass(self):
+        value = 127 if self.bypass else 0
+        if self.recorder is not None and self._sent[self.cc_bypass] != value:
+            self.recorder.record(REC_BYPASS, self.bypass)
+        self._emit(self.cc_bypass, value)
+    
+    def _note_on(self, note, velocity):
+        self.held.press(note, velocity)
+        self.keycounter = len(self.held)
+        if self.mode == "poly":
+            for o in self.oscillators:
+                # A key pressed again keeps its voice with the new velocity.
+                if o.volume > 0 and o.midi_note == note:
+                    o.volume = max(20, velocity)
+            self._assign_voices(note)
+        elif self.mode == "chord":
+            self.bypass     = True
+            self.last_note  = note
+            self._chord_voices(note, velocity)
+        else:
+            self.bypass     = True
+            self.last_note  = note
+            # Intervals that leave (0,...,127) play the key itself.
+            self._mono_voice(0, note, velocity)
+            self._mono_voice(1, note + self.interval1, velocity)
+            self._mono_voice(2, note + self.interval2, velocity)
+    
+    def _mono_voice(self, i, note, velocity):
+        if note < 0 or note > 127:
+            note = self.last_note
+        self.oscillators[i].set_note(note)
+        self.oscillators[i].volume = velocity
+        if self.recorder is not None:
+            self.recorder.record(REC_VOICE, i, note, velocity)
+    
+    def _assign_voices(self, note):
+        voices = self.voices_wanted()
+        # Free the oscillators whose key is not chosen anymore.
+        for i in [0,1,2]:
+            o = self.oscillators[i]
+            if o.volume > 0 and o.midi_note not in voices:
+                if self.recorder is not None:
+                    if o.midi_note in self.held:
+                        self.recorder.record(REC_STEAL, i, o.midi_note, note)
+                    else:
+                        self.recorder.record(REC_RELEASE, i, o.midi_note)
+                o.off()
+        # Give the chosen keys without a voice a free oscillator, taking
+        # turns like the 3NG's oscillators would on a polyphonic synth.
+        for wanted in voices:
+            if wanted < 0:
+                continue
+            playing = False
+            for o in self.oscillators:
+                if o.volume > 0 and o.midi_note == wanted:
+                    playing = True
+            if playing:
+                continue
+            for k in [1,2,3]:
+                i = (self.rotation + k) % 3
+                o = self.oscillators[i]
+                if o.volume == 0:
+                    velocity = self.held.order[wanted]
+                    o.set_note(wanted)
+                    o.volume = max(20, velocity)
+                    self.rotation = i
+                    if self.recorder is not None:
+                        self.recorder.record(REC_VOICE, i, wanted, velocity)
+                    break
+    
+    def voices_wanted(self):
+        """
+        The keys the three oscillators should play right now, see
+        HeldNotes.pick().
+
+        Returns
+        -------
+        list of int
+            Three MIDI note VALUES, -1 for an unused oscillator. The list is
+            reused by the engine.
+
+        """
+        self.held.pick(self._voices)
+        return self._voices
+    
+    def _chord_voices(self, note, velocity):
+        chords = self.chords
+        for i in [0,1,2]:
+            o = self.oscillators[i]
+            j = note*3 + i
+            pitch = chords.pitches[j]
+            o.volume = velocity
+            if o.bend:
+                o.set_note(pitch)
+                self._emit_voice(o)
+            else:
+                o.midi_note = pitch
+                o.octave    = pitch // 12
+                o.note      = pitch - o.octave*12
+                self._emit(o.cc_oct, chords.octs[j])
+                self._emit(o.cc_note, chords.notes[j])
+                self._emit(o.cc_level, velocity)
+            if self.recorder is not None:
+                self.recorder.record(REC_VOICE, i, pitch, velocity)
+    
+    def _note_off(self, note):
+        if not self.held.release(note):
+            return
+        self.keycounter = len(self.held)
+        if self.mode == "poly":
+            self._assign_voices(note)
+        elif note == self.last_note:
+            self.bypass = False
+    
+    def _apply_preset(self, p):
+        silence = p.mode != self.mode or p.voices != self._map
+        if silence:
+            # Voices on CC parameters that are not used anymore would keep
+            # sounding.
+            for o in self.oscillators:
+                if o.volume > 0:
+                    o.off()
+                    self._emit(o.cc_level, 0)
+        if p.cc_bypass != self.cc_bypass and self.bypass:
+            self._emit(self.cc_bypass, 0)
+        retune = (not silence and self.mode == "mono" and self.keycounter > 0
+                  and (p.interval1 != self.interval1 or p.interval2 != self.interval2))
+        revoice = (not silence and self.mode == "chord" and self.keycounter > 0
+                   and p.chords is not self.chords)
+        
+        self.preset         = p
+        self.mode           = p.mode
+        self.interval1      = p.interval1
+        self.interval2      = p.interval2
+        self.cc_bypass      = p.cc_bypass
+        if p.shape is not None:
+            self.shape      = p.shape
+        if p.glide is not None:
+            self.glide      = p.glide
+            for o in self.oscillators:
+                o.glide     = p.glide
+        if p.chords is not None:
+            self.chords     = p.chords
+        self._map           = p.voices
+        for i in [0,1,2]:
+            o = self.oscillators[i]
+            o.cc_shape, o.cc_oct, o.cc_note, o.cc_level, o.cc_glide = p.voices[i]
+            o.monopoly = p.mode
+        if silence:
+            self.bypass = p.mode == "poly"
+            if p.mode == "poly" and self.keycounter > 0:
+                # Held keys sound again on the new CC parameters.
+                self._assign_voices(-1)
+        elif retune:
+            # The held key takes the new intervals right away.
+            velocity = self.oscillators[0].volume
+            self._mono_voice(1, self.last_note + p.interval1, velocity)
+            self._mono_voice(2, self.last_note + p.interval2, velocity)
+        elif revoice:
+            # The held key takes the preset's voicing right away.
+            self._chord_voices(self.last_note, self.oscillators[0].volume)
+        for cc, value in p.setup:
+            self._emit(cc, value)
+    
+    def _silence(self):
+        for o in self.oscillators:
+            o.off()
+        self.held.clear()
+        self.keycounter = 0
+        if self.mode != "poly":
+            self.bypass = False
+    
+    def _apply_controller(self, key, value):
+        if key == "bend":
+            semitones = (value * self.bend_range + 4096) // 8192
+            for o in self.oscillators:
+                if o.bend != semitones:
+                    o.set_bend(semitones)
+                    self._emit(o.cc_oct, olist[o.octave])
+                    self._emit(o.cc_note, nlist[o.note])
+            return
+        target = self.aftertouch if key == "aftertouch" else self.modwheel
+        for o in self.oscillators:
+            # Only voices that sound follow the level, silent ones stay silent.
+            if target == "level" and o.volume > 0:
+                o.volume = max(20, value)
+                self._emit(o.cc_level, o.volume)
+            elif target == "glide":
+                o.glide = value
+                self._emit(o.cc_glide, o.glide)
+    
+    def process(self, status, data1=0, data2=0, timestamp=0.0):
+        """
+        Processes one incoming MIDI message.
+
+        Parameters
+        ----------
+        status : int
+            Status byte of the message.
+        data1 : int, optional
+            First data byte. The default is 0.
+        data2 : int, optional
+            Second data byte. The default is 0.
+        timestamp : float, optional
+            Time of the message in seconds. The default is 0.0.
+
+        Returns
+        -------
+        memoryview
+            Encoded CC messages to be sent to the Helix (may be empty).
+
+        """
+        self._n = 0
+        self.last_time = timestamp
+        if self.recorder is not None:
+            self.recorder.record(REC_IN, status, data1, data2)
+        kind = status & 0xF0
+        if kind == 0x90 and data2 > 0:
+            self._note_on(data1, data2)
+        elif kind == 0x80 or kind == 0x90:
+            self._note_off(data1)
+        elif kind == 0xB0:
+            if data1 == self.cc_off:
+                # Use a CC value as an "emergency exit".
+                self.running        = False
+                self.stop_reason    = "cc_off"
+                self.bypass         = False
+                if self.recorder is not None:
+                    self.recorder.record(REC_STOP, STOP_REASONS["cc_off"])
+            elif data1 == self.cc_panic:
+                self._silence()
+                if self.recorder is not None:
+                    self.recorder.request()
+            elif data1 == self.cc_profile:
+                if self.profiler is not None:
+                    self.profiler.request()
+            elif data1 == self.cc_snapshot:
+                self._start_resync(data1)
+            elif data1 == self.cc_learn:
+                if data2 > 0 and len(self.held) > 0:
+                    self.chords.learn(self.voices_wanted())
+            elif self.modwheel and data1 == self.cc_modwheel:
+                self.thinner.submit("modwheel", data2)
+        elif kind == 0xC0:
+            preset = self.presets.get(data1)
+            if preset is not None:
+                self._apply_preset(preset)
+                self.program = data1
+                if self.recorder is not None:
+                    self.recorder.record(REC_PRESET, data1)
+            if self.program_resync:
+                self._start_resync(128 + data1)
+        elif kind == 0xE0:
+            if self.bend_range:
+                self.thinner.submit("bend", ((data2 << 7) | data1) - 8192)
+        elif kind == 0xD0:
+            if self.aftertouch:
+                self.thinner.submit("aftertouch", data1)
+        
+        # Just to be sure the mono synth stops if nothing is pressed anymore.
+        if self.mode != "poly" and self.keycounter < 1:
+            self.bypass = False
+        if self.mode != "poly":
+            self._emit_voices()
+            self._emit_bypass()
+        else:
+            self._emit_bypass()
+            self._emit_voices()
+        return self._views[self._n]
+    
+    def helix_message(self, status, data1=0, data2=0):
+        """
+        Processes one message from the Helix's own port (helix_inport).
+        A snapshot change (cc_snapshot) or, with program_resync, a Program
+        Change starts a paced resync. Everything else is ignored, so the
+        Helix's Program Changes do not switch the adapter presets and its
+        MIDI thru does not play notes.
+
+        Parameters
+        ----------
+        status : int
+            Status byte of the message.
+        data1 : int, optional
+            First data byte. The default is 0.
+        data2 : int, optional
+            Second data byte. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        kind = status & 0xF0
+        if kind == 0xB0 and data1 == self.cc_snapshot:
+            reason = data1
+        elif kind == 0xC0 and self.program_resync:
+            reason = 128 + data1
+        else:
+            return
+        if self.recorder is not None:
+            self.recorder.record(REC_IN, status, data1, data2)
+        self._start_resync(reason)
+    
+    def _start_resync(self, reason):
+        if self.recorder is not None:
+            self.recorder.record(REC_RESYNC, reason)
+        self.invalidate()
+    
+    def invalidate(self):
+        """
+        Starts a paced resync of the parameters the adapter owns (the
+        oscillators, shape and glide if set or controlled, the 3NG bypass)
+        through tick(). A resync that is running starts over.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.resyncing      = True
+        self._resync_step   = 0
+        self._resync_at     = None
+    
+    def _owns_glide(self):
+        # Glide is the adapter's if it was set or a controller drives it;
+        # the oscillators hold the current value either way.
+        return (self.glide is not None or self.aftertouch == "glide"
+                or self.modwheel == "glide")
+    
+    def _resync_next(self):
+        # Mono sends the bypass last, poly first, as in process(). The
+        # parameters of the step are forgotten right before, so they are
+        # sent even if a message meanwhile sent the same values.
+        step = self._resync_step
+        if self.mode != "poly":
+            i = step
+        else:
+            i = step - 1
+        if 0 <= i <= 2:
+            o = self.oscillators[i]
+            if self.shape is not None:
+                self._sent[o.cc_shape] = 255
+                self._emit(o.cc_shape, self.shape)
+            if self._owns_glide():
+                self._sent[o.cc_glide] = 255
+                self._emit(o.cc_glide, o.glide)
+            self._sent[o.cc_oct]    = 255
+            self._sent[o.cc_note]   = 255
+            self._sent[o.cc_level]  = 255
+            self._emit_voice(o)
+        else:
+            self._sent[self.cc_bypass] = 255
+            self._emit_bypass()
+        self._resync_step = step + 1
+        if step == 3:
+            self.resyncing = False
+    
+    def tick(self, now):
+        """
+        Forwards the thinned continuous controllers (pitch bend, aftertouch,
+        mod wheel) and the next part of a resync. Call this once per pass of
+        the host loop, at least while thinner.pending or resyncing is set.
+
+        Parameters
+        ----------
+        now : float
+            Current time in seconds (perf_counter()).
+
+        Returns
+        -------
+        memoryview
+            Encoded CC messages to be sent to the Helix (may be empty).
+
+        """
+        self._n = 0
+        if self.thinner.pending:
+            for key, value in self.thinner.flush(now):
+                self._apply_controller(key, value)
+        if self.resyncing:
+            if self._resync_at is None:
+                self._resync_at = now + self.resync_delay
+            if now >= self._resync_at:
+                self._resync_next()
+                self._resync_at = now + self.resync_interval
+        return self._views[self._n]
+    
+    def select_preset(self, program):
+        """
+        Switches to the preset of a program number, like a Program Change.
+
+        Parameters
+        ----------
+        program : int
+            Program number (0,...,127). Numbers without a preset change
+            nothing.
+
+        Returns
+        -------
+        memoryview
+            Encoded CC messages to be sent to the Helix (may be empty).
+
+        """
+        self._n = 0
+        preset = self.presets.get(program)
+        if preset is not None:
+            self._apply_preset(preset)
+            self.program = program
+            if self.recorder is not None:
+                self.recorder.record(REC_PRESET, program)
+            if self.mode != "poly":
+                self._emit_voices()
+                self._emit_bypass()
+            else:
+                self._emit_bypass()
+                self._emit_voices()
+        return self._views[self._n]
+    
+    def resync(self):
+        """
+        Forgets what was sent to the Helix and sends every parameter the
+        adapter owns again: the oscillators, shape and glide (if set or
+        controlled) and the 3NG bypass. Also used for the initial state.
+
+        Returns
+        -------
+        memoryview
+            Encoded CC messages to be sent to the Helix.
+
+        """
+        self._n = 0
+        self.resyncing = False
+        for i in range(128):
+            self._sent[i] = 255
+        if self.mode != "poly":
+            # Turn off the 3NG first to be sure.
+            self._emit_bypass()
+        for o in self.oscillators:
+            if self.shape is not None:
+                self._emit(o.cc_shape, self.shape)
+            if self._owns_glide():
+                self._emit(o.cc_glide, o.glide)
+        self._emit_voices()
+        self._emit_bypass()
+        return self._views[self._n]
+    
+    def panic(self):
+        """
+        Silences all voices and forgets the held keys. In mono mode, the 3NG
+        is switched off as well. The adapter keeps running.
+
+        Returns
+        -------
+        memoryview
+            Encoded CC messages to be sent to the Helix.
+
+        """
+        self._n = 0
+        self._silence()
+        self._emit_voices()
+        self._emit_bypass()
+        return self._views[self._n]
+
+
 #############################################################################
 ############### - FUNCTIONS - ###############################################
 #############################################################################
@@ -167,7 +1166,7 @@ class HelixOscillator:
 def activate_adapter(inport, outport, mode, chn, 
                      shp, i1, i2, 
                      ccbyp, ccoff,
-                     ccshp, cco, ccnot, cclev, ccgli, gli):
+                     ccshp, cco, ccnot, cclev, ccgli, gli, board=""):
     if mode == "poly":
         helix_polysynth(    midi_channel    = chn,
                             ccshapes        = ccshp,
@@ -180,7 +1179,8 @@ def activate_adapter(inport, outport, mode, chn,
                             shape           = shp,
                             GUI             = True,
                             gui_inport      = inport,
-                            gui_outport     = outport
+                            gui_outport     = outport,
+                            status_board    = board
                         )
     elif mode == "mono":
         helix_monosynth(    interval1       = i1,
@@ -197,10 +1197,31 @@ def activate_adapter(inport, outport, mode, chn,
                             GUI             = True,
                             gui_inport      = inport,
                             gui_outport     = outport,
-                            glide           = gli
+                            glide           = gli,
+                            status_board    = board
                         )
     else:
         print("ERROR: No synth mode set. Doing nothing.")
+
+def engine_process(conn):
+    """
+    Entry point of the adapter process started by the GUI. The adapter
+    settings arrive as a dict over the pipe; the adapter state goes back
+    through the status board named in the settings.
+
+    Parameters
+    ----------
+    conn : multiprocessing Connection
+        Receiving end of the pipe from the GUI.
+
+    Returns
+    -------
+    None.
+
+    """
+    config = conn.recv()
+    conn.close()
+    activate_adapter(**config)
     
 # def deactivate_adapter():
 #     return
@@ -268,6 +1289,210 @@ def send_all(msg, portlist):
     """
     for p in portlist:
         p.send(msg)
+
+def send_bytes(data, portlist):
+    """
+    This function sends raw CC messages, as returned by HelixEngine, to
+    all ports in a portlist.
+
+    Parameters
+    ----------
+    data : bytes-like
+        Complete 3-byte CC messages.
+    portlist : List of MIDI ports.
+        List of opened (out-) ports. Ports with a send_bytes() method get
+        the bytes as they are, all others get mido messages.
+
+    Returns
+    -------
+    None.
+
+    """
+    for p in portlist:
+        if hasattr(p, "send_bytes"):
+            p.send_bytes(data)
+        else:
+            for i in range(0, len(data), 3):
+                key = (data[i] << 16) | (data[i+1] << 8) | data[i+2]
+                msg = _cc_messages.get(key)
+                if msg is None:
+                    msg = md.Message.from_bytes(data[i:i+3])
+                    _cc_messages[key] = msg
+                p.send(msg)
+
+# mido messages for send_bytes(), created once per CC parameter and value.
+_cc_messages = {}
+        
+def open_inport(name, backend="mido", virtual=False):
+    """
+    Opens an inport with the given backend.
+
+    Parameters
+    ----------
+    name : string
+        Name of the port.
+    backend : string, optional
+        "rtmidi" for the raw python-rtmidi backend, "udp" for MIDI over UDP
+        (name is "host:port" to listen on), "mido" for a mido port. If the
+        raw backend cannot be used, a mido port is opened instead.
+        The default is "mido".
+    virtual : bool, optional
+        Create a virtual port with this name that other programs can
+        connect to, instead of opening an existing one. Not used by the
+        "udp" backend. The default is False.
+
+    Returns
+    -------
+    port : RtMidiInport, UdpInport or mido inport
+        The opened port.
+
+    """
+    if backend == "udp":
+        return UdpInport(*parse_address(name))
+    if backend == "rtmidi":
+        try:
+            return RtMidiInport(name, virtual=virtual)
+        except (ImportError, IOError) as e:
+            print(" Raw rtmidi input not available ({}). Using mido.".format(e))
+    return md.open_input(name, virtual=virtual)
+
+def open_outport(name, backend="mido", virtual=False):
+    """
+    Opens an outport with the given backend.
+
+    Parameters
+    ----------
+    name : string
+        Name of the port, or the serial device for the "serial" backend.
+    backend : string, optional
+        "serial" for a raw serial/UART connection to the 5-pin DIN input
+        of the Helix, "mido" for a mido port. The default is "mido".
+    virtual : bool, optional
+        Create a virtual mido port with this name that other programs can
+        connect to, instead of opening an existing one. Not used by the
+        "serial" backend. The default is False.
+
+    Returns
+    -------
+    port : SerialOutport or mido outport
+        The opened port.
+
+    """
+    if backend == "serial":
+        return SerialOutport(name)
+    return md.open_output(name, virtual=virtual)
+
+def open_ports(gui_inport     = "",
+               gui_outport    = "",
+               GUI            = False,
+               inports        = None,
+               outports       = None,
+               in_backend     = "mido",
+               out_backend    = "mido",
+               helix_inport   = "",
+               virtual_inport = "",
+               monitor_port   = ""
+               ):
+    """
+    Opens the ports of an adapter: the selected ports (all ports if none is
+    selected outside the GUI), the Helix's inport and the virtual ports. If
+    one of them cannot be opened, the ports opened so far are closed again.
+
+    Parameters
+    ----------
+    gui_inport : string, optional
+        Name of the inport, "host:port" with in_backend="udp".
+        The default is "".
+    gui_outport : string, optional
+        Name of the outport, the serial device with out_backend="serial".
+        The default is "".
+    GUI : bool, optional
+        Whether the GUI selected the ports. The default is False.
+    inports : list of ports, optional
+        Already opened inports, used instead of gui_inport.
+        The default is None.
+    outports : list of ports, optional
+        Already opened outports, used instead of gui_outport.
+        The default is None.
+    in_backend : string, optional
+        Backend of the inports, see open_inport(). The default is "mido".
+    out_backend : string, optional
+        Backend of the outports, see open_outport(). The default is "mido".
+    helix_inport : string, optional
+        Name of the Helix's own MIDI inport. The default is "".
+    virtual_inport : string, optional
+        Name of a virtual inport to create. The default is "".
+    monitor_port : string, optional
+        Name of a virtual monitor outport to create. The default is "".
+
+    Returns
+    -------
+    open_iports : list of ports
+        The inports.
+    open_oports : list of ports
+        The outports.
+    helix_iports : list of ports
+        The Helix's inport, if any.
+
+    """
+    if GUI == True:
+        print(" Opening the following ports:")
+        print([gui_inport, gui_outport])
+        inportlist  = [gui_inport]
+        outportlist = [gui_outport]
+    else:
+        if inports is not None:
+            print(" Using the given inports.")
+            inportlist = []
+        elif gui_inport == "" and virtual_inport:
+            inportlist = []
+        elif gui_inport == "":
+            print(" No inport set. Opening ALL inports.")
+            inportlist = md.get_input_names()
+        else:
+            print(" Opening inport {}.".format(gui_inport))
+            inportlist = [gui_inport]
+        if outports is not None:
+            print(" Using the given outports.")
+            outportlist = []
+        elif gui_outport == "":
+            print(" No outport set. Opening ALL outports.")
+            outportlist = md.get_output_names()
+        else:
+            print(" Opening outport {}.".format(gui_outport))
+            outportlist = [gui_outport]
+    
+    # Virtual ports and the Helix's own port are MIDI ports, also when the
+    # keyboard comes over UDP.
+    midi_backend = "rtmidi" if in_backend == "rtmidi" else "mido"
+    open_iports  = [] if inports is None else list(inports)
+    open_oports  = [] if outports is None else list(outports)
+    helix_iports = []
+    opened = []
+    try:
+        for i in inportlist:
+            opened.append(open_inport(i, in_backend))
+            open_iports.append(opened[-1])
+        for o in outportlist:
+            opened.append(open_outport(o, out_backend))
+            open_oports.append(opened[-1])
+        if helix_inport:
+            print(" Opening inport {} for snapshot and preset changes.".format(helix_inport))
+            opened.append(open_inport(helix_inport, midi_backend))
+            helix_iports.append(opened[-1])
+        if virtual_inport:
+            print(" Creating virtual inport {}.".format(virtual_inport))
+            opened.append(open_inport(virtual_inport, midi_backend, virtual=True))
+            open_iports.append(opened[-1])
+        if monitor_port:
+            print(" Creating virtual monitor outport {}.".format(monitor_port))
+            opened.append(open_outport(monitor_port, virtual=True))
+            open_oports.append(opened[-1])
+    except Exception:
+        for port in opened:
+            port.close()
+        raise
+    return open_iports, open_oports, helix_iports
         
 def wave_to_cc(shape):
     """
@@ -299,6 +1524,208 @@ def wave_to_cc(shape):
         wave = 0      
     return wave
 
+def load_presets(path):
+    """
+    Reads the presets for Program Change from a JSON file, e.g.
+
+        [{"program": 0, "name": "Pad", "mode": "poly", "shape": "sine"},
+         {"program": 1, "name": "Fifths", "mode": "mono", "interval1": 7,
+          "interval2": 12, "shape": "saw_up", "glide": 20}]
+
+    Every entry holds a "program" number and the arguments of HelixPreset.
+    All presets are checked when they are loaded, not when they are played.
+
+    Parameters
+    ----------
+    path : string
+        Path of the JSON file.
+
+    Returns
+    -------
+    presets : dict
+        HelixPreset per program number.
+
+    """
+    with open(path) as f:
+        definitions = json.load(f)
+    if isinstance(definitions, dict):
+        definitions = definitions["presets"]
+    presets = {}
+    for d in definitions:
+        d = dict(d)
+        program = d.pop("program")
+        if not 0 <= program <= 127:
+            raise ValueError("Invalid program number {!r}.".format(program))
+        if program in presets:
+            raise ValueError("Program {} is used twice.".format(program))
+        presets[program] = HelixPreset(**d)
+    return presets
+
+def load_chords(path):
+    """
+    Reads the voicings for the chord mode from a JSON file, e.g.
+
+        {"*": [0, 7, 12], "C": [0, 4, 7], "D": [0, 3, 7], "60": [0, 4, 11]}
+
+    Keys are note names (scale degrees), MIDI note VALUES (single keys) or
+    "*" (all keys), see ChordMemory.
+
+    Parameters
+    ----------
+    path : string
+        Path of the JSON file.
+
+    Returns
+    -------
+    chords : dict
+        Intervals per key.
+
+    """
+    with open(path) as f:
+        chords = json.load(f)
+    if "chords" in chords and isinstance(chords["chords"], dict):
+        chords = chords["chords"]
+    return chords
+
+def run_adapter(engine, open_iports, open_oports, realtime=False,
+                status_board="", helix_iports=None):
+    """
+    Main loop of the adapter: feeds the messages of the inports into the
+    engine and sends what it returns to the outports, until the engine
+    stops. Closes the ports afterwards.
+
+    Parameters
+    ----------
+    engine : HelixEngine
+        The adapter engine.
+    open_iports : list of ports
+        Opened inports. Ports with a poll_raw() method (see helix_ports.py)
+        hand over raw bytes, all others are polled for mido messages.
+    open_oports : list of ports
+        Opened outports.
+    realtime : bool, optional
+        Run the loop in real-time mode (see helix_realtime.py).
+        The default is False.
+    status_board : string, optional
+        Name of a StatusBoard to publish the adapter state to, created if
+        it does not exist. Without a board, the adapter runs anyway.
+        The default is "".
+    helix_iports : list of ports, optional
+        Opened inports of the Helix itself. Their messages only go to
+        engine.helix_message(), i.e. only start resyncs. The default is None.
+
+    Returns
+    -------
+    None.
+
+    """
+    helix_iports = [] if helix_iports is None else list(helix_iports)
+    
+    board = None
+    if status_board:
+        try:
+            board = open_board(status_board)
+        except (OSError, ValueError) as e:
+            print(" Status board {!r} not available ({}). Running without it.".format(
+                status_board, e))
+    
+    # Send the initial status of the oscillators (plus waveshape and glide
+    # from the GUI) and the 3NG bypass to the Helix device.
+    send_bytes(engine.resync(), open_oports)
+    
+    # Apply the real-time settings once everything is set up.
+    rt = enter_realtime() if realtime else None
+    
+    recorder = engine.recorder
+    if recorder is not None and recorder.install_signal():
+        print(" Flight recorder: send SIGUSR1 to process {} for a dump.".format(os.getpid()))
+    profiler = engine.profiler
+    if profiler is not None:
+        # Sample the thread that runs this loop.
+        profiler.thread_id = threading.get_ident()
+        if profiler.install_signal():
+            print(" Profiler: send SIGUSR2 to process {} to start/stop it.".format(os.getpid()))
+    pollers = [(p.poll_raw, True, p in helix_iports) if hasattr(p, "poll_raw")
+               else (p.poll, False, p in helix_iports)
+               for p in open_iports + helix_iports]
+    events = 0
+    frames = 0
+    
+    # Initialze the main loop.
+    print(" Starting main loop of the adapter. Fingers crossed!")
+    while engine.running: 
+        for poll, raw, helix in pollers:
+            msg = poll()
+            if msg is None:
+                if rt is not None:
+                    rt.idle()
+                if board is not None:
+                    board.beat()
+                if recorder is not None and recorder.requested:
+                    recorder.dump()
+                if profiler is not None and profiler.requested:
+                    profiler.toggle()
+                continue
+            if raw:
+                status, data1, data2, t = msg
+            else:
+                b = msg.bytes()
+                status  = b[0]
+                data1   = b[1] if len(b) > 1 else 0
+                data2   = b[2] if len(b) > 2 else 0
+                t       = msg.time
+            if helix:
+                engine.helix_message(status, data1, data2)
+                continue
+            if engine.mode == "poly" and status & 0xE0 == 0x80:
+                if status & 0xF0 == 0x90 and data2 > 0:
+                    print("NOTE ON received for note {}.".format(data1))
+                else:
+                    print("NOTE OFF received for note {}.".format(data1))
+            
+            out = engine.process(status, data1, data2, t)
+            events += 1
+            if out:
+                send_bytes(out, open_oports)
+                frames += 1
+            if status & 0xF0 == 0xC0 and engine.presets:
+                if data1 in engine.presets:
+                    print(" Program Change {}: preset {} ({}).".format(
+                        data1, engine.presets[data1].name, engine.mode))
+                else:
+                    print(" Program Change {}: no preset.".format(data1))
+            if board is not None:
+                board.publish(engine.oscillators, engine.bypass,
+                              engine.keycounter, events, frames,
+                              mode=engine.mode, running=engine.running)
+            if not engine.running:
+                break
+        
+        # Forward the thinned continuous controllers and resyncs once per pass.
+        if engine.thinner.pending or engine.resyncing:
+            out = engine.tick(time.perf_counter())
+            if out:
+                send_bytes(out, open_oports)
+                frames += 1
+    
+    if engine.stop_reason == "cc_off":
+        print(" CC value {} received. Stopping the adapter.".format(engine.cc_off))
+    if recorder is not None and engine.stop_reason in STOP_REASONS:
+        recorder.dump(reason=engine.stop_reason)
+    if profiler is not None:
+        profiler.stop()
+    print(" ... Shutting adapter down. Goodbye.")
+    if rt is not None:
+        rt.exit()
+    if board is not None:
+        board.stop()
+        board.close()
+    for i in open_iports + helix_iports:
+        i.close()
+    for o in open_oports:
+        o.close()
+    print(" ..::: Ports are closed. :::..")
+
 def helix_polysynth(midi_channel = 0,
                     ccshapes        = [80,85,90],
                     ccocts          = [81,86,91],
@@ -310,7 +1737,30 @@ def helix_polysynth(midi_channel = 0,
                     shape           = "saw_up",
                     GUI             = False,
                     gui_inport      = "",
-                    gui_outport     = ""
+                    gui_outport     = "",
+                    inports         = None,
+                    outports        = None,
+                    realtime        = False,
+                    in_backend      = "mido",
+                    out_backend     = "mido",
+                    status_board    = "",
+                    bend_range      = 0,
+                    aftertouch      = "",
+                    modwheel        = "",
+                    cc_modwheel     = 1,
+                    thinning        = None,
+                    presets         = None,
+                    program         = None,
+                    flight_recorder = 0,
+                    cc_panic        = None,
+                    dump_dir        = ".",
+                    virtual_inport  = "",
+                    monitor_port    = "",
+                    cc_profile      = None,
+                    profile_interval = 0.005,
+                    cc_snapshot     = None,
+                    program_resync  = False,
+                    helix_inport    = ""
                     ):
     """
     This function provides the main loop of the Helix-MIDI adapter.
@@ -353,6 +1803,92 @@ def helix_polysynth(midi_channel = 0,
         Name of the inport to be used. The default is "".
     gui_outport : string, optional
         Name of the outport to be used. The default is "".
+    inports : list of ports, optional
+        Already opened inports (anything with poll() and close()). If given,
+        these are used instead of opening gui_inport. The default is None.
+    outports : list of ports, optional
+        Already opened outports (anything with send() and close()), e.g. a
+        Helix3NGEmulator. If given, these are used instead of opening
+        gui_outport. The default is None.
+    realtime : bool, optional
+        Run the main loop in real-time mode (see helix_realtime.py): freeze
+        the start-up objects, defer the garbage collection to idle polls,
+        pin the loop to a CPU core and raise its scheduling priority where
+        permitted. The default is False.
+    in_backend : string, optional
+        How the inports are read. "rtmidi" takes the raw bytes from a
+        python-rtmidi callback (see helix_ports.py), "udp" receives MIDI
+        over the network and treats gui_inport as "host:port" to listen on,
+        "mido" uses mido's ports. Falls back to "mido" if rtmidi cannot be
+        used. The default is "mido".
+    out_backend : string, optional
+        How the outports are written. "serial" treats gui_outport as a
+        serial device (e.g. "/dev/serial0") and writes raw MIDI bytes with
+        running status at 31250 baud (see helix_ports.py), "mido" uses
+        mido's ports. The default is "mido".
+    status_board : string, optional
+        Name of a StatusBoard (see helix_status.py) that the adapter
+        publishes its voices, bypass and counters to. It is created if no
+        reader has created it yet. "" publishes nothing. The default is "".
+    bend_range : int, optional
+        Pitch bend range in semitones. Pitch bend then steps the note and
+        octave CCs of the oscillators. 0 ignores pitch bend.
+        The default is 0.
+    aftertouch : string, optional
+        What channel aftertouch controls: "level", "glide" or "" for
+        nothing. The default is "".
+    modwheel : string, optional
+        What the mod wheel controls: "level", "glide" or "" for nothing.
+        The default is "".
+    cc_modwheel : int, optional
+        Control Change (CC) parameter of the mod wheel. The default is 1.
+    thinning : dict, optional
+        Overrides the thinning of "bend", "aftertouch" and "modwheel" as
+        (deadband, rate cap in seconds, resting value), see
+        helix_controllers.py. The default is None.
+    presets : string or dict, optional
+        Presets that a Program Change switches to: the path of a JSON file
+        (see load_presets()) or a dict of HelixPreset per program number.
+        A preset may also switch between poly and mono. The default is None.
+    program : int, optional
+        Program number of the preset to start with. The default is None.
+    flight_recorder : int, optional
+        Number of events the flight recorder keeps in memory (see
+        helix_recorder.py). They are written to a file in dump_dir on
+        SIGUSR1, on cc_panic and when the adapter stops on cc_off.
+        0 records nothing. The default is 0.
+    cc_panic : int, optional
+        Control Change (CC) parameter that silences all voices and writes
+        a flight recorder dump. The default is None.
+    dump_dir : string, optional
+        Directory for the flight recorder dumps and the profiles.
+        The default is ".".
+    virtual_inport : string, optional
+        Name of a virtual MIDI inport the adapter creates, so a DAW or
+        another program on this machine can play the Helix directly. If no
+        gui_inport is set, it is the only inport. Needs a backend with
+        virtual ports (rtmidi on Linux/macOS). The default is "".
+    monitor_port : string, optional
+        Name of a virtual MIDI outport the adapter creates, which gets a
+        copy of every CC sent to the Helix. The default is "".
+    cc_profile : int, optional
+        Control Change (CC) parameter that starts and stops the sampling
+        profiler (see helix_profiler.py). SIGUSR2 does the same. The stacks
+        are written to dump_dir when it stops. The default is None.
+    profile_interval : float, optional
+        Seconds between two samples of the profiler. The default is 0.005.
+    cc_snapshot : int, optional
+        Control Change (CC) parameter of a snapshot change, e.g. 69 as sent
+        by the Helix. On it, the adapter sends everything it owns on the
+        3NG again, paced over a few milliseconds. Note that keyboards may
+        use CC69 for a hold pedal. The default is None.
+    program_resync : bool, optional
+        Resync the 3NG the same way on every Program Change (a preset
+        change on the Helix or a foot controller). The default is False.
+    helix_inport : string, optional
+        Name of an additional inport the snapshot and preset changes arrive
+        on, e.g. the Helix's own USB port when it sends its changes there.
+        Always a MIDI port, also with in_backend="udp". The default is "".
 
     Returns
     -------
@@ -360,121 +1896,56 @@ def helix_polysynth(midi_channel = 0,
 
     """
       
-    # Initialize the oscillator objects
-    oscillators = []
-    for o in [0,1,2]:
-        oscillators.append(HelixOscillator(ccshapes[o], 
-                                      ccocts[o], 
-                                      ccnotes[o], 
-                                      cclevels[o], 
-                                      ccglides[o],
-                                      channel = midi_channel
-                                      )
-                           )
+    # Initialize the adapter engine
+    if isinstance(presets, str):
+        presets = load_presets(presets)
+    recorder = FlightRecorder(flight_recorder, dump_dir) if flight_recorder else None
+    engine = HelixEngine(mode            = "poly",
+                         midi_channel    = midi_channel,
+                         ccshapes        = ccshapes,
+                         ccocts          = ccocts,
+                         ccnotes         = ccnotes,
+                         cclevels        = cclevels,
+                         ccglides        = ccglides,
+                         cc_bypass       = cc_bypass,
+                         cc_off          = cc_off,
+                         shape           = shape if GUI == True else None,
+                         bend_range      = bend_range,
+                         aftertouch      = aftertouch,
+                         modwheel        = modwheel,
+                         cc_modwheel     = cc_modwheel,
+                         thinning        = thinning,
+                         presets         = presets,
+                         program         = program,
+                         recorder        = recorder,
+                         cc_panic        = cc_panic,
+                         profiler        = SamplingProfiler(profile_interval, dump_dir),
+                         cc_profile      = cc_profile,
+                         cc_snapshot     = cc_snapshot,
+                         program_resync  = program_resync
+                         )
         
     # Opening the ports.
-    if GUI == True:
-        print(" Starting the polysynth adapter... \n Opening selected ports...")
-        inportlist  = [gui_inport]
-        outportlist = [gui_outport]
-        print(" Opening the following ports:")
-        print([gui_inport, gui_outport])
-    else:
-        print(" Starting the polysynth adapter...")
-        if gui_inport == "":
-            print(" No inport set. Opening ALL inports.")
-            inportlist = md.get_input_names()
-        else:
-            print(" Opening inport {}.".format(gui_inport))
-            inportlist = [gui_inport]
-        if gui_outport == "":
-            print(" No outport set. Opening ALL outports.")
-            outportlist = md.get_output_names()
-        else:
-            print(" Opening outport {}".format(gui_outport))
-            outportlist = [gui_outport]
-            
-    open_iports = []
-    open_oports = []
-    for i in inportlist:
-        open_iports.append(md.open_input(i))
-    for o in outportlist:
-        open_oports.append(md.open_output(o))
+    print(" Starting the polysynth adapter...")
+    open_iports, open_oports, helix_iports = open_ports(
+                gui_inport      = gui_inport,
+                gui_outport     = gui_outport,
+                GUI             = GUI,
+                inports         = inports,
+                outports        = outports,
+                in_backend      = in_backend,
+                out_backend     = out_backend,
+                helix_inport    = helix_inport,
+                virtual_inport  = virtual_inport,
+                monitor_port    = monitor_port
+                )
     print(" DONE.")   
     
-    
-    # Send the initial status of the oscillators to the Helix device.
-    # This way, basically all sliders on the 3NG are set to zero.    
-    for o in oscillators:
-        for m in o.gen_message():
-            send_all(m, open_oports)
-            
-    # Send the waveshape info from the GUI to the Helix device. 
-    for i in [0,1,2]:
-        if GUI == True:
-            msg_w = md.Message('control_change', 
-                                            channel = midi_channel, 
-                                            control = ccshapes[i],
-                                            value   = wave_to_cc(shape)
-                                            )  
-            send_all(msg_w, open_oports)
-    
-    # Turn on the 3NG    
-    send_all(turn_3ng_on(midi_channel, cc_bypass), open_oports)
-
-
-    # Initialze the main loop.
-    print(" Starting main loop of the adapter. Fingers crossed!")
-    keycounter = 0
-    rotation = -1
-    loop = True
-    while loop: 
-        if keycounter > 7:
-            loop = False
-            send_all(turn_3ng_off(midi_channel, cc_bypass), open_oports)
-            print("More than 7 Keys pressed. Aborting adapter main loop.")
-        for port in open_iports:
-            msg = port.poll()
-            if msg is not None:
-                # Wait for MIDI input through the inport
-                if msg.type=="note_on":
-                    # Update the oscillator's state with the information from the
-                    # message that was received.
-                    print("NOTE ON received for note {}.".format(msg.note))
-                    oscillators[rotation].update_oscillator(msg)
-                    # Update the rotation parameter to choose the next oscillator
-                    # to simulate a polyphonic synth.
-                    rotation = (rotation + 1)%3
-                    # Increase the key counter by one.
-                    keycounter +=1
-        
-                elif msg.type=="note_off":
-                    # Switch the oscillator off if a note is released.
-                    print("NOTE OFF received for note {}.".format(msg.note))
-                    # Decrease the key counter by one.
-                    keycounter -=1
-                    for i in [0,1,2]:
-                        if msg.note == oscillators[i].midi_note:
-                            oscillators[i].off()
-                    
-                elif msg.type=="control_change":
-                    # Use a CC value as an "emergency exit" out of the main loop.
-                    if msg.control == cc_off: 
-                        loop = False
-                        send_all(turn_3ng_off(midi_channel, cc_bypass), open_oports)
-                        
-                # Send the information for ALL oscillators to the Helix device.
-                for o in oscillators:
-                    for m in o.gen_message():
-                        send_all(m, open_oports)
-                        
-                
-    print("... Shutting adapter down. Goodbye.")
-    for i in open_iports:
-        i.close()
-    for o in open_oports:
-        o.close()
-    print(" ..::: Ports are closed. :::..")
+    run_adapter(engine, open_iports, open_oports,
+                realtime        = realtime,
+                status_board    = status_board,
+                helix_iports    = helix_iports
+                )
     
     
 def helix_monosynth(interval1 = 0,
@@ -491,7 +1962,33 @@ def helix_monosynth(interval1 = 0,
                     GUI             = False,
                     gui_inport      = "",
                     gui_outport     = "",
-                    glide           = 0
+                    glide           = 0,
+                    inports         = None,
+                    outports        = None,
+                    realtime        = False,
+                    in_backend      = "mido",
+                    out_backend     = "mido",
+                    status_board    = "",
+                    bend_range      = 0,
+                    aftertouch      = "",
+                    modwheel        = "",
+                    cc_modwheel     = 1,
+                    thinning        = None,
+                    presets         = None,
+                    program         = None,
+                    flight_recorder = 0,
+                    cc_panic        = None,
+                    dump_dir        = ".",
+                    virtual_inport  = "",
+                    monitor_port    = "",
+                    cc_profile      = None,
+                    profile_interval = 0.005,
+                    cc_snapshot     = None,
+                    program_resync  = False,
+                    helix_inport    = "",
+                    chords          = None,
+                    chord_scope     = "all",
+                    cc_learn        = None
                     ):
     """
     
@@ -537,6 +2034,104 @@ def helix_monosynth(interval1 = 0,
         Name of the outport to be used. The default is "".
     glide : int, optional
         Glide value to be used. The default is 0.
+    inports : list of ports, optional
+        Already opened inports (anything with poll() and close()). If given,
+        these are used instead of opening gui_inport. The default is None.
+    outports : list of ports, optional
+        Already opened outports (anything with send() and close()), e.g. a
+        Helix3NGEmulator. If given, these are used instead of opening
+        gui_outport. The default is None.
+    realtime : bool, optional
+        Run the main loop in real-time mode (see helix_realtime.py): freeze
+        the start-up objects, defer the garbage collection to idle polls,
+        pin the loop to a CPU core and raise its scheduling priority where
+        permitted. The default is False.
+    in_backend : string, optional
+        How the inports are read. "rtmidi" takes the raw bytes from a
+        python-rtmidi callback (see helix_ports.py), "udp" receives MIDI
+        over the network and treats gui_inport as "host:port" to listen on,
+        "mido" uses mido's ports. Falls back to "mido" if rtmidi cannot be
+        used. The default is "mido".
+    out_backend : string, optional
+        How the outports are written. "serial" treats gui_outport as a
+        serial device (e.g. "/dev/serial0") and writes raw MIDI bytes with
+        running status at 31250 baud (see helix_ports.py), "mido" uses
+        mido's ports. The default is "mido".
+    status_board : string, optional
+        Name of a StatusBoard (see helix_status.py) that the adapter
+        publishes its voices, bypass and counters to. It is created if no
+        reader has created it yet. "" publishes nothing. The default is "".
+    bend_range : int, optional
+        Pitch bend range in semitones. Pitch bend then steps the note and
+        octave CCs of the oscillators. 0 ignores pitch bend.
+        The default is 0.
+    aftertouch : string, optional
+        What channel aftertouch controls: "level", "glide" or "" for
+        nothing. The default is "".
+    modwheel : string, optional
+        What the mod wheel controls: "level", "glide" or "" for nothing.
+        The default is "".
+    cc_modwheel : int, optional
+        Control Change (CC) parameter of the mod wheel. The default is 1.
+    thinning : dict, optional
+        Overrides the thinning of "bend", "aftertouch" and "modwheel" as
+        (deadband, rate cap in seconds, resting value), see
+        helix_controllers.py. The default is None.
+    presets : string or dict, optional
+        Presets that a Program Change switches to: the path of a JSON file
+        (see load_presets()) or a dict of HelixPreset per program number.
+        A preset may also switch between poly and mono. The default is None.
+    program : int, optional
+        Program number of the preset to start with. The default is None.
+    flight_recorder : int, optional
+        Number of events the flight recorder keeps in memory (see
+        helix_recorder.py). They are written to a file in dump_dir on
+        SIGUSR1, on cc_panic and when the adapter stops on cc_off.
+        0 records nothing. The default is 0.
+    cc_panic : int, optional
+        Control Change (CC) parameter that silences all voices and writes
+        a flight recorder dump. The default is None.
+    dump_dir : string, optional
+        Directory for the flight recorder dumps and the profiles.
+        The default is ".".
+    virtual_inport : string, optional
+        Name of a virtual MIDI inport the adapter creates, so a DAW or
+        another program on this machine can play the Helix directly. If no
+        gui_inport is set, it is the only inport. Needs a backend with
+        virtual ports (rtmidi on Linux/macOS). The default is "".
+    monitor_port : string, optional
+        Name of a virtual MIDI outport the adapter creates, which gets a
+        copy of every CC sent to the Helix. The default is "".
+    cc_profile : int, optional
+        Control Change (CC) parameter that starts and stops the sampling
+        profiler (see helix_profiler.py). SIGUSR2 does the same. The stacks
+        are written to dump_dir when it stops. The default is None.
+    profile_interval : float, optional
+        Seconds between two samples of the profiler. The default is 0.005.
+    cc_snapshot : int, optional
+        Control Change (CC) parameter of a snapshot change, e.g. 69 as sent
+        by the Helix. On it, the adapter sends everything it owns on the
+        3NG again, paced over a few milliseconds. Note that keyboards may
+        use CC69 for a hold pedal. The default is None.
+    program_resync : bool, optional
+        Resync the 3NG the same way on every Program Change (a preset
+        change on the Helix or a foot controller). The default is False.
+    helix_inport : string, optional
+        Name of an additional inport the snapshot and preset changes arrive
+        on, e.g. the Helix's own USB port when it sends its changes there.
+        Always a MIDI port, also with in_backend="udp". The default is "".
+    chords : string or dict, optional
+        Switches to the chord mode: every key plays a stored 3-note voicing
+        instead of the two intervals. The path of a JSON file or a dict of
+        voicings, see ChordMemory, e.g. {"C": [0,4,7], "D": [0,3,7]}. Keys
+        without a voicing play the two intervals. The default is None.
+    chord_scope : string, optional
+        What a learned voicing is stored for: "all" keys, the scale
+        "degree" of its lowest note, or only that "key".
+        The default is "all".
+    cc_learn : int, optional
+        Control Change (CC) parameter that stores the held keys as voicing
+        (and switches to the chord mode). The default is None.
 
     Returns
     -------
@@ -544,142 +2139,65 @@ def helix_monosynth(interval1 = 0,
 
     """
     
-    # Initialize the oscillator objects
-    oscillators = []
-    for o in [0,1,2]:
-        oscillators.append(HelixOscillator(ccshapes[o], 
-                                      ccocts[o], 
-                                      ccnotes[o], 
-                                      cclevels[o], 
-                                      ccglides[o],
-                                      channel  = midi_channel,
-                                      monopoly = "mono"
-                                      )
-                           )
+    # Initialize the adapter engine
+    if isinstance(presets, str):
+        presets = load_presets(presets)
+    if isinstance(chords, str):
+        chords = load_chords(chords)
+    recorder = FlightRecorder(flight_recorder, dump_dir) if flight_recorder else None
+    chord_mode = chords is not None or cc_learn is not None
+    engine = HelixEngine(mode            = "chord" if chord_mode else "mono",
+                         interval1       = interval1,
+                         interval2       = interval2,
+                         midi_channel    = midi_channel,
+                         ccshapes        = ccshapes,
+                         ccocts          = ccocts,
+                         ccnotes         = ccnotes,
+                         cclevels        = cclevels,
+                         ccglides        = ccglides,
+                         cc_bypass       = cc_bypass,
+                         cc_off          = cc_off,
+                         shape           = shape if GUI == True else None,
+                         glide           = glide if GUI == True else None,
+                         bend_range      = bend_range,
+                         aftertouch      = aftertouch,
+                         modwheel        = modwheel,
+                         cc_modwheel     = cc_modwheel,
+                         thinning        = thinning,
+                         presets         = presets,
+                         program         = program,
+                         recorder        = recorder,
+                         cc_panic        = cc_panic,
+                         profiler        = SamplingProfiler(profile_interval, dump_dir),
+                         cc_profile      = cc_profile,
+                         cc_snapshot     = cc_snapshot,
+                         program_resync  = program_resync,
+                         chords          = chords,
+                         chord_scope     = chord_scope,
+                         cc_learn        = cc_learn
+                         )
         
     # Opening the ports.
-    if GUI == True:
-        print(" Starting the monosynth adapter... \n Opening selected ports...")
-        inportlist  = [gui_inport]
-        outportlist = [gui_outport]
-        print([gui_inport, gui_outport])
-    else:
-        print(" Starting the polysynth adapter...")
-        if gui_inport == "":
-            print("No inport set. Opening ALL inports.")
-            inportlist = md.get_input_names()
-        else:
-            print("Opening inport {}.".format(gui_inport))
-            inportlist = [gui_inport]
-        if gui_outport == "":
-            print("No outport set. Opening ALL outports.")
-            outportlist = md.get_output_names()
-        else:
-            print("Opening outprt {}".format(gui_outport))
-            outportlist = [gui_outport]
-            
-    open_iports = []
-    open_oports = []
-    for i in inportlist:
-        open_iports.append(md.open_input(i))
-    for o in outportlist:
-        open_oports.append(md.open_output(o))
+    print(" Starting the monosynth adapter...")
+    open_iports, open_oports, helix_iports = open_ports(
+                gui_inport      = gui_inport,
+                gui_outport     = gui_outport,
+                GUI             = GUI,
+                inports         = inports,
+                outports        = outports,
+                in_backend      = in_backend,
+                out_backend     = out_backend,
+                helix_inport    = helix_inport,
+                virtual_inport  = virtual_inport,
+                monitor_port    = monitor_port
+                )
     print(" DONE.")   
     
-
-    # Turn off the 3NG  to be sure   
-    send_all(turn_3ng_off(midi_channel, cc_bypass), open_oports)
-    
-    # Send the glide and waveshape info from the GUI to the Helix device. 
-    for i in [0,1,2]:
-        if GUI == True:
-            msg_w = md.Message('control_change', 
-                                            channel = midi_channel, 
-                                            control = ccshapes[i],
-                                            value   = wave_to_cc(shape)
-                                            )  
-            msg_g = md.Message('control_change', 
-                                            channel = midi_channel, 
-                                            control = ccglides[i],
-                                            value   = glide
-                                            )  
-            send_all(msg_w, open_oports)
-            send_all(msg_g, open_oports)
-    
-    
-    # Initialze the main loop.
-    print(" Starting main loop of the adapter. Fingers crossed!")
-    
-    keycounter  = 0
-    last_note   = 0
-    loop        = True
-    TNGstate    = False
-    while loop: 
-        for port in open_iports:
-            msg = port.poll()
-            if msg is not None:
-                # Wait for MIDI input through the inport
-                if msg.type=="note_on":
-                    TNGstate = True
-                    
-                    # Increase the key counter by one.
-                    keycounter +=1
-                    
-                    # Remember the last key pressed
-                    last_note = msg.note
-                    
-                    # Update all three oscillators
-                    # And check that the interval notes are in range of (0,...,127)
-                    intvl_notes  = [msg.note, 
-                                     msg.note + interval1,
-                                     msg.note + interval2]
-                    
-                    for i in [0,1,2]:
-                        if intvl_notes[i] < 0:
-                            intvl_notes[i] = msg.note
-                        elif intvl_notes[i] > 127:
-                            intvl_notes[i] = msg.note
-                        oscillators[i].set_note(intvl_notes[i])
-                        oscillators[i].volume = msg.velocity
-
-        
-        
-                elif msg.type=="note_off":
-                    # Decrease the key counter by one.
-                    keycounter -= 1
-                    # If the key of the note playing right now is released, stop the
-                    # synth.
-                    if msg.note == last_note:
-                        TNGstate = False
-            
-                elif msg.type=="control_change":
-                    # Use a CC value as an "emergency exit" out of the main loop.
-                    if msg.control == cc_off: 
-                        print(" CC value {} received. Stopping the adapter.".format(cc_off))
-                        loop        = False
-                        TNGstate    = False
-                        
-                # Send the information for aLL oscillators to the Helix device.
-                for o in oscillators:
-                    for m in o.gen_message(monopoly="mono"):
-                        send_all(m, open_oports)
-                        
-                # This conditional is just to be sure the synth stops if nothing is
-                # pressed anymore.           
-                if keycounter < 1:
-                    TNGstate = False
-                    
-                if TNGstate == True:
-                    send_all(turn_3ng_on(midi_channel, cc_bypass), open_oports)
-                else:
-                    send_all(turn_3ng_off(midi_channel, cc_bypass), open_oports)
-                
-    print(" ... Shutting adapter down. Goodbye.")
-    for i in open_iports:
-        i.close()
-    for o in open_oports:
-        o.close()
-    print(" ..::: Ports are closed. :::..")
+    run_adapter(engine, open_iports, open_oports,
+                realtime        = realtime,
+                status_board    = status_board,
+                helix_iports    = helix_iports
+                )
     
     
     
@@ -900,29 +2418,58 @@ def helix_midi_adapter_GUI():
                              )
     
     ## Adapter Controls
+    # The adapter runs in its own process, so redrawing the GUI never
+    # competes with the note path for the GIL. The settings are sent over a
+    # pipe, the adapter state comes back through the status board.
+    engine = {"process": None}
+    
+    def start_adapter():
+        if engine["process"] is not None and engine["process"].is_alive():
+            print(" The adapter is already running.")
+            return
+        conn_gui, conn_engine = mp.Pipe()
+        engine["process"] = mp.Process(target=engine_process,
+                                       args=(conn_engine,),
+                                       daemon=True)
+        engine["process"].start()
+        conn_gui.send(dict(
+                  inport    = midi_in.get(), 
+                  outport   = midi_out.get(), 
+                  mode      = adapter_mode.get(), 
+                  chn       = cc_channel.get(), 
+                  shp       = shape.get(), 
+                  i1        = intvl1.get(), 
+                  i2        = intvl2.get(), 
+                  ccbyp     = cc_bypass.get(), 
+                  ccoff     = 18,
+                  ccshp     = [cc_osc[0][0].get(),cc_osc[1][0].get(),cc_osc[2][0].get()], 
+                  cco       = [cc_osc[0][1].get(),cc_osc[1][1].get(),cc_osc[2][1].get()], 
+                  ccnot     = [cc_osc[0][2].get(),cc_osc[1][2].get(),cc_osc[2][2].get()],  
+                  cclev     = [cc_osc[0][3].get(),cc_osc[1][3].get(),cc_osc[2][3].get()],  
+                  ccgli     = [cc_osc[0][4].get(),cc_osc[1][4].get(),cc_osc[2][4].get()],
+                  gli       = glide_entry.get(),
+                  board     = board.name
+                  ))
+        conn_gui.close()
+    
     button_start = ttk.Button(lf_control, 
                               text = "Start adapter!",
-                              command = lambda: threading.Thread(
-                                  target = activate_adapter(
-                                      inport    = midi_in.get(), 
-                                      outport   = midi_out.get(), 
-                                      mode      = adapter_mode.get(), 
-                                      chn       = cc_channel.get(), 
-                                      shp       = shape.get(), 
-                                      i1        = intvl1.get(), 
-                                      i2        = intvl2.get(), 
-                                      ccbyp     = cc_bypass.get(), 
-                                      ccoff     = 18,
-                                      ccshp     = [cc_osc[0][0].get(),cc_osc[1][0].get(),cc_osc[2][0].get()], 
-                                      cco       = [cc_osc[0][1].get(),cc_osc[1][1].get(),cc_osc[2][1].get()], 
-                                      ccnot     = [cc_osc[0][2].get(),cc_osc[1][2].get(),cc_osc[2][2].get()],  
-                                      cclev     = [cc_osc[0][3].get(),cc_osc[1][3].get(),cc_osc[2][3].get()],  
-                                      ccgli     = [cc_osc[0][4].get(),cc_osc[1][4].get(),cc_osc[2][4].get()],
-                                      gli       = glide_entry.get()
-                                      )
-                                  ).start()
+                              command = start_adapter
                               )
     
+    ## Adapter status, read from the status board
+    try:
+        board = StatusBoard(create=True)
+    except FileExistsError:
+        # Left over from a crashed session.
+        board = StatusBoard()
+        board.owner = True
+    l_status = ttk.Label(lf_control, text=format_status(None), justify=tk.LEFT)
+    
+    def refresh_status():
+        l_status.configure(text=format_status(board.read()))
+        root.after(100, refresh_status)
+    
     # button_stop = ttk.Button(lf_control, 
     #                           text = "Stop adapter!",
     #                           command = lambda: deactivate_adapter()
@@ -940,7 +2487,7 @@ def helix_midi_adapter_GUI():
     l_logo  = tk.Label(image=logo)
     
     ## Additional info
-    additional_info = "Set the bypass control of the 3-Note-Generator block to the value above. \n \nAdjust the parameters of the three oscillators to be controlled by the CC values above (80-94 is the default). \n\n It is advisable to turn Snapshot Control for the 3NG block off.  \n\n Send CC parameter 18 (any value) to stop the adapter in emergencies.\n Pressing more than 7 keys also stops the adapter."
+    additional_info = "Set the bypass control of the 3-Note-Generator block to the value above. \n \nAdjust the parameters of the three oscillators to be controlled by the CC values above (80-94 is the default). \n\n It is advisable to turn Snapshot Control for the 3NG block off.  \n\n Send CC parameter 18 (any value) to stop the adapter in emergencies."
     l_info = ttk.Label(lf_info, text=additional_info)
     
     ## Device section
@@ -1031,9 +2578,17 @@ def helix_midi_adapter_GUI():
     ## Start button
     button_start.grid(column=0, row=1, padx=px, pady=py, sticky=tk.NSEW)
     
+    ## Adapter status
+    l_status.grid(column=0, row=2, padx=px, pady=py, sticky=tk.W)
     
     
     
+    refresh_status()
     root.mainloop()
+    
+    if engine["process"] is not None and engine["process"].is_alive():
+        engine["process"].terminate()
+        engine["process"].join()
+    board.close()
        
     
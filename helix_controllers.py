@@ -0,0 +1,114 @@
+#############################################################################
+############### - DEFAULT THINNING - ########################################
+#############################################################################
+
+# Per controller: (deadband, rate cap in seconds, resting value).
+# The deadband is in the controller's own units, the resting value always
+# passes the deadband, so a released pitch bend wheel or mod wheel is never
+# swallowed.
+THINNING = {
+    "bend":         (64, 0.005, 0),
+    "aftertouch":   (2,  0.010, 0),
+    "modwheel":     (2,  0.010, 0),
+    }
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class ThinnedController:
+    __slots__ = ("deadband", "min_interval", "rest", "sent", "sent_at",
+                 "pending")
+
+    def __init__(self, deadband=0, min_interval=0.0, rest=None):
+        self.deadband       = deadband
+        self.min_interval   = min_interval
+        self.rest           = rest
+        self.sent           = None
+        self.sent_at        = float("-inf")
+        self.pending        = None
+
+
+class ControllerThinner:
+    """
+    Thins out continuous controllers (pitch bend, aftertouch, mod wheel)
+    before they are turned into CCs for the Helix.
+
+    Incoming values are only stored (last value wins). Once per pass of the
+    adapter loop, flush() hands out the stored values that
+
+    * differ from the last forwarded value by at least the deadband (or are
+      the resting value), and
+    * are at least min_interval seconds after the last forwarded value.
+
+    Values that are held back by the rate cap stay stored and go out with a
+    later flush(), so the final position of a controller always arrives.
+    """
+    def __init__(self, thinning=None):
+        self.controllers    = {}
+        self.pending        = 0
+        self.received       = 0
+        self.forwarded      = 0
+        settings = dict(THINNING)
+        if thinning is not None:
+            settings.update(thinning)
+        for key, (deadband, min_interval, rest) in settings.items():
+            self.controllers[key] = ThinnedController(deadband, min_interval, rest)
+
+    def submit(self, key, value):
+        """
+        Stores the newest value of a controller.
+
+        Parameters
+        ----------
+        key : string
+            Controller name, e.g. "bend".
+        value : int
+            Controller value.
+
+        Returns
+        -------
+        None.
+
+        """
+        c = self.controllers[key]
+        if c.pending is None:
+            self.pending += 1
+        c.pending = value
+        self.received += 1
+
+    def flush(self, now):
+        """
+        Hands out the stored values that make a difference.
+
+        Parameters
+        ----------
+        now : float
+            Current time in seconds (perf_counter()).
+
+        Returns
+        -------
+        list of tuple
+            (key, value) for every controller that is to be forwarded.
+
+        """
+        out = []
+        for key, c in self.controllers.items():
+            value = c.pending
+            if value is None:
+                continue
+            if c.sent is not None and (value == c.sent or (
+                    value != c.rest and abs(value - c.sent) < c.deadband)):
+                c.pending = None
+                self.pending -= 1
+                continue
+            if now - c.sent_at < c.min_interval:
+                continue
+            c.sent      = value
+            c.sent_at   = now
+            c.pending   = None
+            self.pending -= 1
+            self.forwarded += 1
+            out.append((key, value))
+        return out
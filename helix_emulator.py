@@ -0,0 +1,329 @@
+import time
+from collections import deque
+import mido as md
+
+from functions import olist, nlist, wave_to_cc
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class EmulatedOscillator:
+    def __init__(self, shape=0, octave=0, note=0, level=0, glide=0):
+        self.shape      = shape
+        self.octave     = octave
+        self.note       = note
+        self.level      = level
+        self.glide      = glide
+
+    @property
+    def pitch(self):
+        """
+        MIDI note VALUE (0,...,107) the oscillator is tuned to.
+
+        """
+        return self.octave * 12 + self.note
+
+
+class Helix3NGEmulator:
+    """
+    Stand-in for a Helix device with one 3-Note-Generator (3NG) block.
+
+    The emulator behaves like an opened mido outport (send() and close()),
+    so it can be handed to helix_polysynth() / helix_monosynth() via the
+    outports argument. Every CC the adapter sends is decoded the way the
+    Helix does it, and every change of what is audible is timestamped.
+
+    An oscillator is audible if the 3NG is switched on and its level is
+    above zero. Audible changes are stored in self.events as tuples of
+    (time, oscillator index, pitch, level), with pitch None if the
+    oscillator fell silent.
+    """
+    def __init__(self, midi_channel = 0,
+                 ccshapes        = [80,85,90],
+                 ccocts          = [81,86,91],
+                 ccnotes         = [82,87,92],
+                 cclevels        = [83,88,93],
+                 ccglides        = [84,89,94],
+                 cc_bypass       = 77,
+                 max_events      = 100000,
+                 clock           = time.perf_counter,
+                 name            = "Helix 3NG emulator"
+                 ):
+        self.name           = name
+        self.channel        = midi_channel
+        self.cc_bypass      = cc_bypass
+        self.clock          = clock
+        self.closed         = False
+        self.on             = False
+        self.received       = 0
+        self.ignored        = 0
+        self.events         = deque(maxlen=max_events)
+        self._status        = None
+        self._data          = []
+        self.oscillators    = [EmulatedOscillator() for o in [0,1,2]]
+
+        # Map each CC parameter onto (oscillator, attribute, value table).
+        # A value table of None means the CC value is used as it is.
+        self.cc_map = {}
+        for o in [0,1,2]:
+            self.cc_map[ccshapes[o]]  = (o, "shape",  None)
+            self.cc_map[ccocts[o]]    = (o, "octave", olist)
+            self.cc_map[ccnotes[o]]   = (o, "note",   nlist)
+            self.cc_map[cclevels[o]]  = (o, "level",  None)
+            self.cc_map[ccglides[o]]  = (o, "glide",  None)
+
+        self._audible = [self.audible(o) for o in [0,1,2]]
+
+    def audible(self, o):
+        """
+        Audible state of one oscillator.
+
+        Parameters
+        ----------
+        o : int
+            Oscillator index (0,1,2).
+
+        Returns
+        -------
+        tuple
+            (pitch, level) of the oscillator, or (None, 0) if it is silent.
+
+        """
+        osc = self.oscillators[o]
+        if self.on and osc.level > 0:
+            return (osc.pitch, osc.level)
+        return (None, 0)
+
+    def send(self, msg):
+        """
+        Consumes a MIDI message like the Helix would.
+
+        Parameters
+        ----------
+        msg : mido MIDI message
+            Message sent by the adapter. Everything but CC messages on the
+            emulated channel is ignored.
+
+        Returns
+        -------
+        None.
+
+        """
+        if msg.type != 'control_change' or msg.channel != self.channel:
+            self.ignored += 1
+            return
+        self.control_change(msg.control, msg.value)
+
+    def send_bytes(self, data):
+        """
+        Consumes raw MIDI bytes like the Helix' DIN input would, including
+        running status. Messages may be split across calls.
+
+        Parameters
+        ----------
+        data : bytes-like or list of int
+            Raw MIDI bytes.
+
+        Returns
+        -------
+        None.
+
+        """
+        for b in data:
+            if b >= 0xF8:
+                continue
+            if b >= 0x80:
+                self._status = b if b < 0xF0 else None
+                self._data = []
+                continue
+            if self._status is None:
+                continue
+            self._data.append(b)
+            kind = self._status & 0xF0
+            length = 1 if kind in [0xC0, 0xD0] else 2
+            if len(self._data) == length:
+                if kind == 0xB0 and (self._status & 0x0F) == self.channel:
+                    self.control_change(self._data[0], self._data[1])
+                else:
+                    self.ignored += 1
+                self._data = []
+
+    def control_change(self, control, value):
+        """
+        Applies a single CC parameter change to the emulated 3NG.
+
+        Parameters
+        ----------
+        control : int
+            CC parameter (0,...,127).
+        value : int
+            CC value (0,...,127).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.received += 1
+        if control == self.cc_bypass:
+            self.on = value >= 64
+            changed = [0,1,2]
+        elif control in self.cc_map:
+            o, attribute, table = self.cc_map[control]
+            if table is not None:
+                # The Helix splits the CC range into equally sized steps.
+                value = value * len(table) // 128
+            setattr(self.oscillators[o], attribute, value)
+            changed = [o]
+        else:
+            self.ignored += 1
+            return
+
+        now = self.clock()
+        for o in changed:
+            state = self.audible(o)
+            if state != self._audible[o]:
+                self._audible[o] = state
+                self.events.append((now, o, state[0], state[1]))
+
+    def close(self):
+        """
+        Marks the emulated port as closed. The 3NG state is kept.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.closed = True
+
+    def reset(self):
+        """
+        Puts the emulated 3NG back into its power-on state and clears the
+        recorded events and counters.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.on         = False
+        self.received   = 0
+        self.ignored    = 0
+        self.events.clear()
+        self.oscillators = [EmulatedOscillator() for o in [0,1,2]]
+        self._audible   = [self.audible(o) for o in [0,1,2]]
+
+    def sounding(self):
+        """
+        Pitches that are audible right now.
+
+        Returns
+        -------
+        list of int
+            MIDI note VALUES, one per audible oscillator.
+
+        """
+        return [p for p, l in self._audible if p is not None]
+
+    def sounded(self, since=None):
+        """
+        Every pitch that became audible, in order.
+
+        Parameters
+        ----------
+        since : float, optional
+            Only report events at or after this time. The default is None.
+
+        Returns
+        -------
+        list of tuple
+            (time, oscillator index, pitch) for every audible change.
+
+        """
+        return [(t, o, p) for t, o, p, l in self.events
+                if p is not None and (since is None or t >= since)]
+
+    def glitch_windows(self, threshold=0.002):
+        """
+        Finds pitches that were only audible for a short moment before the
+        same oscillator changed to another pitch, e.g. the old note in the
+        new octave between the octave CC and the note CC.
+
+        Parameters
+        ----------
+        threshold : float, optional
+            Longest time in seconds that still counts as a glitch.
+            The default is 0.002.
+
+        Returns
+        -------
+        list of tuple
+            (time, oscillator index, pitch, duration) for every glitch.
+
+        """
+        glitches = []
+        last = [None, None, None]
+        for t, o, p, l in self.events:
+            previous = last[o]
+            if (previous is not None and previous[1] is not None
+                    and p is not None and p != previous[1]
+                    and t - previous[0] < threshold):
+                glitches.append((previous[0], o, previous[1], t - previous[0]))
+            last[o] = (t, p)
+        return glitches
+
+    def shape_name(self, o):
+        """
+        Name of the waveshape of one oscillator.
+
+        Parameters
+        ----------
+        o : int
+            Oscillator index (0,1,2).
+
+        Returns
+        -------
+        string
+            Waveshape as used by wave_to_cc(), or the raw value if it does
+            not match any of them.
+
+        """
+        for shape in ["saw_up", "saw_down", "triangle", "sine", "square"]:
+            if wave_to_cc(shape) == self.oscillators[o].shape:
+                return shape
+        return str(self.oscillators[o].shape)
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def emulate_on_port(portname="Helix 3NG emulator", virtual=True, **kwargs):
+    """
+    Runs a Helix3NGEmulator behind a MIDI inport, so an adapter running in
+    another process can send to it like to a real Helix.
+
+    Parameters
+    ----------
+    portname : string, optional
+        Name of the port. The default is "Helix 3NG emulator".
+    virtual : bool, optional
+        Create a virtual port (not available on Windows). If False, an
+        existing port of that name is opened. The default is True.
+    **kwargs
+        Passed on to Helix3NGEmulator (CC parameters, channel, ...).
+
+    Returns
+    -------
+    emulator : Helix3NGEmulator
+        The emulator that is fed from the port.
+    port : mido inport
+        The opened port. Close it to stop the emulation.
+
+    """
+    emulator = Helix3NGEmulator(name=portname, **kwargs)
+    port = md.open_input(portname, virtual=virtual, callback=emulator.send)
+    return emulator, port
@@ -35,11 +35,18 @@ from functions import *
 
 # Use the adapter with a graphic user interface (GUI)
 # This one takes no arguments, as everything is set in the GUI.
-helix_midi_adapter_GUI()
+# The adapter itself is started in a separate process, hence the guard.
+if __name__ == "__main__":
+    helix_midi_adapter_GUI()
 
 # Start the Polysynth adapter:
 # helix_polysynth()
 
+# Start the Polysynth adapter headless in real-time mode (GC control, CPU
+# pinning and raised priority where permitted, e.g. when run as root):
+# helix_polysynth(gui_inport='MPK Mini 1', gui_outport='Line 6 Helix 1',
+#                 realtime=True)
+
 # Start the Monosynth adapter:
 # THIS ONE HAS FIXED INTERVALS FOR OSC2 AND OSC3
 #helix_monosynth(0,7)
@@ -0,0 +1,646 @@
+import os
+import socket
+import struct
+import time
+from collections import deque
+
+try:
+    import rtmidi
+except ImportError:
+    rtmidi = None
+
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = None
+
+
+#############################################################################
+############### - MIDI STATUS BYTES - #######################################
+#############################################################################
+
+NOTE_OFF        = 0x80
+NOTE_ON         = 0x90
+CONTROL_CHANGE  = 0xB0
+PROGRAM_CHANGE  = 0xC0
+AFTERTOUCH      = 0xD0
+PITCHWHEEL      = 0xE0
+
+
+#############################################################################
+############### - NETWORK FRAMING - #########################################
+#############################################################################
+
+# Every UDP datagram carries an 8-byte header followed by one or more
+# complete MIDI channel messages (running status is allowed inside one
+# datagram):
+#
+#   bytes 0-1   magic b"HX"
+#   bytes 2-3   sequence number, uint16 big endian, +1 per datagram
+#   bytes 4-7   sender timestamp in microseconds, uint32 big endian
+#
+# The timestamp only has to come from a steady clock on the sender. The
+# receiver does not need synchronized clocks: it reports latency relative to
+# the fastest datagram seen so far, i.e. the network and queueing delay on
+# top of the best case.
+UDP_MAGIC       = b"HX"
+UDP_HEADER      = struct.Struct(">2sHI")
+UDP_PORT        = 5004
+# Datagrams at most this many sequence numbers behind the expected one are
+# late; a larger step back means the sender has restarted.
+UDP_REORDER     = 64
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class RawMessage:
+    """
+    Lightweight stand-in for a mido message, carrying only what the adapter
+    loops look at. Unused fields are None.
+    """
+    __slots__ = ("type", "channel", "note", "velocity", "control", "value",
+                 "pitch", "program", "time")
+
+    def __init__(self, type, channel, note=None, velocity=None,
+                 control=None, value=None, pitch=None, program=None,
+                 time=0.0):
+        self.type       = type
+        self.channel    = channel
+        self.note       = note
+        self.velocity   = velocity
+        self.control    = control
+        self.value      = value
+        self.pitch      = pitch
+        self.program    = program
+        self.time       = time
+
+    def __repr__(self):
+        if self.type == 'control_change':
+            return "RawMessage('control_change', channel={}, control={}, value={}, time={})".format(
+                self.channel, self.control, self.value, self.time)
+        if self.type == 'pitchwheel':
+            return "RawMessage('pitchwheel', channel={}, pitch={}, time={})".format(
+                self.channel, self.pitch, self.time)
+        if self.type == 'program_change':
+            return "RawMessage('program_change', channel={}, program={}, time={})".format(
+                self.channel, self.program, self.time)
+        if self.type == 'aftertouch':
+            return "RawMessage('aftertouch', channel={}, value={}, time={})".format(
+                self.channel, self.value, self.time)
+        return "RawMessage('{}', channel={}, note={}, velocity={}, time={})".format(
+            self.type, self.channel, self.note, self.velocity, self.time)
+
+
+class RtMidiInport:
+    """
+    Inport that takes the bytes straight from a python-rtmidi callback
+    instead of going through mido's parser.
+
+    Channel messages are queued as (status, data1, data2, time) tuples;
+    clock, active sensing and SysEx are already dropped inside rtmidi. The
+    message time is the sum of rtmidi's delta timestamps, i.e. seconds since
+    the first message.
+
+    poll_raw() hands out the tuples as they are, which is what the adapter
+    loop uses. poll() decodes NOTE ON, NOTE OFF, CC, channel aftertouch,
+    pitch bend and Program Change into RawMessage objects like a mido port
+    would, passing a NOTE ON with velocity 0 on as NOTE OFF. Close it with
+    close().
+
+    With virtual=True, a new port called name is created that other
+    programs (e.g. a DAW) can send to, instead of opening an existing one.
+    """
+    def __init__(self, name, virtual=False):
+        if rtmidi is None:
+            raise ImportError("python-rtmidi is not installed.")
+        self.name       = name
+        self.closed     = False
+        self._queue     = deque()
+        self._clock     = 0.0
+        self._first     = True
+
+        self._midi_in   = rtmidi.MidiIn()
+        index = None
+        if not virtual:
+            ports = self._midi_in.get_ports()
+            if name in ports:
+                index = ports.index(name)
+            else:
+                # Port names on Linux carry a client:port suffix.
+                matches = [i for i, p in enumerate(ports) if p.startswith(name)]
+                if not matches:
+                    self._midi_in.delete()
+                    raise IOError("Unknown port {!r}. Available: {}".format(name, ports))
+                index = matches[0]
+        self._midi_in.ignore_types(sysex=True, timing=True, active_sense=True)
+        self._midi_in.set_callback(self._callback)
+        if virtual:
+            try:
+                self._midi_in.open_virtual_port(name)
+            except (NotImplementedError, rtmidi.RtMidiError) as e:
+                self._midi_in.delete()
+                raise IOError("Cannot create virtual port {!r}: {}".format(name, e))
+        else:
+            self._midi_in.open_port(index)
+
+    def _callback(self, event, data=None):
+        message, delta = event
+        # The first delta is the time since the port was opened.
+        if self._first:
+            self._first = False
+        else:
+            self._clock += delta
+        if len(message) < 2 or message[0] >= 0xF0:
+            return
+        self._queue.append((message[0], message[1],
+                            message[2] if len(message) > 2 else 0, self._clock))
+
+    def poll_raw(self):
+        """
+        Returns the next received message as raw bytes.
+
+        Returns
+        -------
+        tuple or None
+            (status, data1, data2, time) of the oldest message that was not
+            polled yet, or None.
+
+        """
+        if self._queue:
+            return self._queue.popleft()
+        return None
+
+    def poll(self):
+        """
+        Returns the next received message.
+
+        Returns
+        -------
+        msg : RawMessage or None
+            The oldest message that was not polled yet, or None.
+
+        """
+        while self._queue:
+            msg = decode_message(*self._queue.popleft())
+            if msg is not None:
+                return msg
+        return None
+
+    def close(self):
+        """
+        Closes the port.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.closed:
+            self._midi_in.cancel_callback()
+            self._midi_in.close_port()
+            self._midi_in.delete()
+            self.closed = True
+
+
+class SerialOutport:
+    """
+    Outport that writes raw MIDI bytes to a serial device, e.g. the UART of
+    a Raspberry Pi wired to the 5-pin DIN input of the Helix.
+
+    Consecutive channel messages with the same status byte are sent with
+    running status, i.e. the status byte is left out. A frame of 9 CCs on
+    one channel then takes 19 instead of 27 bytes. After status_refresh
+    seconds without output, the status byte is sent again, so a receiver
+    that was reconnected in between picks the stream up again.
+
+    It has send() and close() like a mido outport, so it can be used with
+    send_all().
+    """
+    def __init__(self, device, baudrate=31250, status_refresh=1.0):
+        self.name           = device
+        self.baudrate       = baudrate
+        self.status_refresh = status_refresh
+        self.closed         = False
+        self.bytes_written  = 0
+        self.bytes_saved    = 0
+        self.messages       = 0
+        self._running       = None
+        self._first_write   = None
+        self._last_write    = 0.0
+
+        self._fd = os.open(device, os.O_WRONLY | os.O_NOCTTY)
+        if termios is not None and os.isatty(self._fd):
+            self._configure(baudrate)
+
+    def _configure(self, baudrate):
+        tty.setraw(self._fd)
+        speed = getattr(termios, "B{}".format(baudrate), None)
+        if speed is None:
+            if baudrate != 31250:
+                raise ValueError("Baudrate {} is not supported.".format(baudrate))
+            # 31250 baud is no standard rate. On a Raspberry Pi the UART
+            # clock is set up (e.g. init_uart_clock in config.txt) so that
+            # 38400 comes out as 31250.
+            speed = termios.B38400
+        attrs = termios.tcgetattr(self._fd)
+        attrs[4] = speed
+        attrs[5] = speed
+        termios.tcsetattr(self._fd, termios.TCSANOW, attrs)
+
+    def send(self, msg):
+        """
+        Sends a mido message (or anything else with a bytes() method).
+
+        Parameters
+        ----------
+        msg : mido MIDI message
+            Message to be sent.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.send_bytes(msg.bytes())
+
+    def send_bytes(self, data):
+        """
+        Sends raw MIDI bytes, leaving out repeated status bytes.
+
+        Parameters
+        ----------
+        data : bytes-like or list of int
+            One or more complete MIDI messages.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.perf_counter()
+        if now - self._last_write > self.status_refresh:
+            self._running = None
+
+        out = bytearray()
+        for b in data:
+            if b >= 0xF8:
+                # System real-time messages do not touch running status.
+                out.append(b)
+            elif b >= 0xF0:
+                # System common messages and SysEx cancel running status.
+                self._running = None
+                out.append(b)
+            elif b >= 0x80:
+                self.messages += 1
+                if b == self._running:
+                    self.bytes_saved += 1
+                else:
+                    self._running = b
+                    out.append(b)
+            else:
+                out.append(b)
+
+        # A tty may take only part of the buffer per write.
+        view = memoryview(out)
+        written = 0
+        while written < len(out):
+            written += os.write(self._fd, view[written:])
+        self.bytes_written += len(out)
+        self._last_write = now
+        if self._first_write is None:
+            self._first_write = now
+
+    def stats(self):
+        """
+        Throughput of the port so far.
+
+        Returns
+        -------
+        stats : dict
+            Bytes written and saved by running status, number of channel
+            messages and the achieved bytes/s since the first write.
+
+        """
+        seconds = 0.0
+        if self._first_write is not None:
+            seconds = time.perf_counter() - self._first_write
+        return {"bytes":        self.bytes_written,
+                "bytes_saved":  self.bytes_saved,
+                "messages":     self.messages,
+                "seconds":      seconds,
+                "bytes_per_s":  self.bytes_written / seconds if seconds > 0 else 0.0}
+
+    def close(self):
+        """
+        Closes the device and prints the throughput.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.closed:
+            s = self.stats()
+            print(" Serial out {}: {} bytes ({} saved by running status), {:.0f} bytes/s.".format(
+                self.name, s["bytes"], s["bytes_saved"], s["bytes_per_s"]))
+            os.close(self._fd)
+            self.closed = True
+
+class UdpInport:
+    """
+    Inport that receives MIDI over UDP (see NETWORK FRAMING above), e.g.
+    from a laptop or wireless controller on the stage network.
+
+    The socket is non-blocking and read inside poll(), so no extra thread is
+    involved. Gaps in the sequence numbers are counted as lost datagrams,
+    duplicated or late datagrams (up to UDP_REORDER behind) are counted and
+    dropped, a larger step back is taken as a restarted sender. Incomplete
+    messages (e.g. a status byte where a data byte belongs) are counted as
+    invalid and dropped. Like RtMidiInport, poll_raw() returns (status,
+    data1, data2, time) tuples and poll() RawMessage objects, timed with the
+    receive time.
+    """
+    def __init__(self, host="0.0.0.0", port=UDP_PORT, history=1000):
+        self.name           = "{}:{}".format(host, port)
+        self.closed         = False
+        self.packets        = 0
+        self.lost           = 0
+        self.late           = 0
+        self.restarts       = 0
+        self.invalid        = 0
+        self.latencies      = deque(maxlen=history)
+        self._queue         = deque()
+        self._expected      = None
+        self._min_offset    = None
+        self._buffer        = bytearray(1500)
+        self._view          = memoryview(self._buffer)
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.setblocking(False)
+
+    def _receive(self):
+        try:
+            n = self._sock.recv_into(self._buffer)
+        except (BlockingIOError, InterruptedError):
+            return False
+        now = time.perf_counter()
+        if n < UDP_HEADER.size:
+            self.invalid += 1
+            return True
+        magic, seq, stamp = UDP_HEADER.unpack_from(self._buffer)
+        if magic != UDP_MAGIC:
+            self.invalid += 1
+            return True
+
+        if self._expected is not None:
+            gap = (seq - self._expected) & 0xFFFF
+            if gap >= 0x10000 - UDP_REORDER:
+                self.late += 1
+                return True
+            if gap >= 0x8000:
+                # A new stream: its timestamps come from another clock.
+                self.restarts += 1
+                self._min_offset = None
+            else:
+                self.lost += gap
+        self._expected = (seq + 1) & 0xFFFF
+        self.packets += 1
+
+        offset = (int(now * 1000000) - stamp) & 0xFFFFFFFF
+        if self._min_offset is None or offset < self._min_offset:
+            self._min_offset = offset
+        self.latencies.append((offset - self._min_offset) / 1000000)
+
+        status = None
+        i = UDP_HEADER.size
+        buf = self._view
+        while i < n:
+            if buf[i] >= 0x80:
+                status = buf[i]
+                i += 1
+            if status is None or status >= 0xF0:
+                # Only channel messages are carried.
+                self.invalid += 1
+                break
+            kind = status & 0xF0
+            length = 1 if kind == 0xC0 or kind == 0xD0 else 2
+            j = i
+            while j < i + length and j < n and buf[j] < 0x80:
+                j += 1
+            if j < i + length:
+                # Cut short by the end of the datagram, or by a status byte,
+                # which starts the next message.
+                self.invalid += 1
+                i = j
+                continue
+            self._queue.append((status, buf[i], buf[i + 1] if length == 2 else 0, now))
+            i += length
+        return True
+
+    def poll_raw(self):
+        """
+        Returns the next received message as raw bytes, reading the socket
+        if no message is waiting.
+
+        Returns
+        -------
+        tuple or None
+            (status, data1, data2, time) of the oldest message that was not
+            polled yet, or None.
+
+        """
+        if not self._queue:
+            while self._receive() and not self._queue:
+                pass
+        if self._queue:
+            return self._queue.popleft()
+        return None
+
+    def poll(self):
+        """
+        Returns the next received message, reading the socket if no message
+        is waiting.
+
+        Returns
+        -------
+        msg : RawMessage or None
+            The oldest message that was not polled yet, or None.
+
+        """
+        raw = self.poll_raw()
+        while raw is not None:
+            msg = decode_message(*raw)
+            if msg is not None:
+                return msg
+            raw = self.poll_raw()
+        return None
+
+    def stats(self):
+        """
+        Receive statistics.
+
+        Returns
+        -------
+        stats : dict
+            Datagrams received, lost, late and invalid, sender restarts,
+            and the median, 99th percentile and maximum latency in ms over
+            the last datagrams.
+
+        """
+        lat = sorted(self.latencies)
+        n = len(lat)
+        return {"packets":  self.packets,
+                "lost":     self.lost,
+                "late":     self.late,
+                "restarts": self.restarts,
+                "invalid":  self.invalid,
+                "p50_ms":   lat[n // 2] * 1000 if n else 0.0,
+                "p99_ms":   lat[min(n - 1, int(n * 0.99))] * 1000 if n else 0.0,
+                "max_ms":   lat[-1] * 1000 if n else 0.0}
+
+    def close(self):
+        """
+        Closes the socket and prints the receive statistics.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.closed:
+            s = self.stats()
+            print(" UDP in {}: {} datagrams, {} lost, {} late, {} restarts, latency p50 {:.3f} ms, p99 {:.3f} ms.".format(
+                self.name, s["packets"], s["lost"], s["late"], s["restarts"], s["p50_ms"], s["p99_ms"]))
+            self._sock.close()
+            self.closed = True
+
+
+class UdpOutport:
+    """
+    Sender side of the UDP framing, e.g. for a laptop that plays the
+    adapter over the network, or for tests over localhost. Every send()
+    is one datagram.
+    """
+    def __init__(self, host="127.0.0.1", port=UDP_PORT):
+        self.name       = "{}:{}".format(host, port)
+        self.closed     = False
+        self.seq        = 0
+        self._address   = (host, port)
+        self._sock      = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, msg):
+        """
+        Sends a mido message (or anything else with a bytes() method).
+
+        Parameters
+        ----------
+        msg : mido MIDI message
+            Message to be sent.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.send_bytes(msg.bytes())
+
+    def send_bytes(self, data):
+        """
+        Sends one or more complete MIDI channel messages in one datagram.
+
+        Parameters
+        ----------
+        data : bytes-like or list of int
+            Raw MIDI bytes.
+
+        Returns
+        -------
+        None.
+
+        """
+        stamp = int(time.perf_counter() * 1000000) & 0xFFFFFFFF
+        self._sock.sendto(UDP_HEADER.pack(UDP_MAGIC, self.seq, stamp) + bytes(data),
+                          self._address)
+        self.seq = (self.seq + 1) & 0xFFFF
+
+    def close(self):
+        if not self.closed:
+            self._sock.close()
+            self.closed = True
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def decode_message(status, data1, data2, time=0.0):
+    """
+    Decodes a channel message into a RawMessage.
+
+    Parameters
+    ----------
+    status : int
+        Status byte.
+    data1 : int
+        First data byte (note, CC parameter, pressure or pitch LSB).
+    data2 : int
+        Second data byte (velocity, CC value or pitch MSB). 0 for
+        two-byte messages.
+    time : float, optional
+        Timestamp of the message. The default is 0.0.
+
+    Returns
+    -------
+    msg : RawMessage or None
+        NOTE ON, NOTE OFF, CC, aftertouch, pitchwheel (pitch -8192,...,8191
+        like mido) or program change message; None for anything else. A
+        NOTE ON with velocity 0 is returned as NOTE OFF.
+
+    """
+    kind = status & 0xF0
+    if kind == NOTE_ON:
+        if data2 == 0:
+            return RawMessage('note_off', status & 0x0F, note=data1,
+                              velocity=0, time=time)
+        return RawMessage('note_on', status & 0x0F, note=data1,
+                          velocity=data2, time=time)
+    if kind == NOTE_OFF:
+        return RawMessage('note_off', status & 0x0F, note=data1,
+                          velocity=data2, time=time)
+    if kind == CONTROL_CHANGE:
+        return RawMessage('control_change', status & 0x0F, control=data1,
+                          value=data2, time=time)
+    if kind == PITCHWHEEL:
+        return RawMessage('pitchwheel', status & 0x0F,
+                          pitch=((data2 << 7) | data1) - 8192, time=time)
+    if kind == AFTERTOUCH:
+        return RawMessage('aftertouch', status & 0x0F, value=data1, time=time)
+    if kind == PROGRAM_CHANGE:
+        return RawMessage('program_change', status & 0x0F, program=data1,
+                          time=time)
+    return None
+
+def parse_address(address, default_host="0.0.0.0"):
+    """
+    Splits a "host:port" string.
+
+    Parameters
+    ----------
+    address : string
+        "host:port", ":port" or "port".
+    default_host : string, optional
+        Host if none is given. The default is "0.0.0.0".
+
+    Returns
+    -------
+    host : string
+    port : int
+
+    """
+    host, sep, port = address.rpartition(":")
+    return (host or default_host), int(port)
@@ -0,0 +1,194 @@
+import os
+import signal
+import sys
+import threading
+import time
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class SamplingProfiler:
+    """
+    Looks at the adapter loop's stack every few milliseconds from a thread
+    of its own and counts how often each stack was seen. Nothing is traced,
+    so the adapter runs at full speed in between; a sample costs about as
+    much as one pass through the MIDI backend.
+
+    The counts are written as collapsed stacks ("outer;inner;leaf count"
+    per line), the input format of flamegraph.pl, speedscope and similar
+    tools.
+
+    Start and stop it with start()/stop(), or call request() (e.g. from a
+    signal handler) and let the adapter loop call toggle() when it is idle.
+    """
+    def __init__(self, interval=0.005, directory=".", thread_id=None):
+        self.interval   = interval
+        self.directory  = directory
+        self.thread_id  = threading.get_ident() if thread_id is None else thread_id
+        self.requested  = False
+        self.samples    = 0
+        self.counts     = {}
+        self.files      = 0
+        self._labels    = {}
+        self._thread    = None
+        self._stop      = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = "{}:{}".format(os.path.basename(code.co_filename),
+                                   getattr(code, "co_qualname", code.co_name))
+            self._labels[code] = label
+        return label
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        key = tuple(stack)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """
+        Starts sampling.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self._thread is not None:
+            return
+        self.samples = 0
+        self.counts = {}
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="helix-profiler",
+                                        daemon=True)
+        self._thread.start()
+        print(" Profiler started, one sample every {:.1f} ms.".format(self.interval * 1000))
+
+    def stop(self):
+        """
+        Stops sampling and writes the collapsed stacks.
+
+        Returns
+        -------
+        path : string or None
+            The written file, None if the profiler was not running.
+
+        """
+        if self._thread is None:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return self.write()
+
+    def toggle(self):
+        """
+        Starts the profiler if it is stopped and stops it if it runs.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.requested = False
+        if self._thread is None:
+            self.start()
+        else:
+            self.stop()
+
+    def request(self, signum=None, frame=None):
+        """
+        Asks for the profiler to be started or stopped at the next
+        convenient moment of the adapter loop. Usable as a signal handler.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.requested = True
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR2", None)):
+        """
+        Requests a start/stop whenever the process receives a signal. Has
+        to be called from the main thread.
+
+        Parameters
+        ----------
+        signum : int, optional
+            The signal. The default is SIGUSR2 (not available on Windows).
+
+        Returns
+        -------
+        bool
+            Whether the handler could be installed.
+
+        """
+        if signum is None:
+            return False
+        try:
+            signal.signal(signum, self.request)
+        except ValueError:
+            # Not the main thread.
+            return False
+        return True
+
+    def collapsed(self):
+        """
+        The samples as collapsed stacks, outermost function first.
+
+        Returns
+        -------
+        list of string
+            "outer;...;leaf count" per stack, most frequent first.
+
+        """
+        lines = []
+        for key, count in sorted(self.counts.items(), key=lambda kv: -kv[1]):
+            lines.append("{} {}".format(
+                ";".join(self._label(code) for code in reversed(key)), count))
+        return lines
+
+    def write(self, path=None):
+        """
+        Writes the collapsed stacks to a file.
+
+        Parameters
+        ----------
+        path : string, optional
+            File to write. The default is a file named after the date and
+            time in the profiler's directory.
+
+        Returns
+        -------
+        path : string
+            The written file.
+
+        """
+        if path is None:
+            path = os.path.join(self.directory, "helix_profile_{}_{}.txt".format(
+                time.strftime("%Y%m%d_%H%M%S"), self.files))
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(line + "\n")
+        self.files += 1
+        print(" Profiler stopped: {} samples written to {}.".format(self.samples, path))
+        return path
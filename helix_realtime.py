@@ -0,0 +1,239 @@
+import gc
+import os
+import time
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class RealtimeMode:
+    """
+    Opt-in process tuning for the adapter's main loop.
+
+    enter() freezes all objects created during start-up (gc.freeze()),
+    switches the automatic cyclic garbage collection off, pins the calling
+    thread to one CPU core and asks for SCHED_FIFO scheduling, falling back
+    to a raised niceness. Everything that is not permitted or not available
+    on this platform is skipped and reported.
+
+    With gc_mode "defer", the young generations are collected in idle()
+    calls, i.e. while no MIDI message is waiting, at most once every
+    collect_interval seconds. With gc_mode "off" nothing is collected until
+    exit().
+
+    The adapter loop polls its ports without pause. Under SCHED_FIFO such a
+    loop would starve everything else on its core, including the backend
+    thread that receives the MIDI messages. So once SCHED_FIFO is applied,
+    idle() sleeps for idle_sleep seconds.
+    """
+    def __init__(self, cpu                  = None,
+                 priority               = 10,
+                 niceness               = -10,
+                 gc_mode                = "defer",
+                 collect_interval       = 1.0,
+                 collect_generation     = 1,
+                 idle_sleep             = 0.0002
+                 ):
+        self.cpu                = cpu
+        self.priority           = priority
+        self.niceness           = niceness
+        self.gc_mode            = gc_mode
+        self.collect_interval   = collect_interval
+        self.collect_generation = collect_generation
+        self.idle_sleep         = idle_sleep
+        self.fifo               = False
+        self.applied            = {}
+        self.collections        = 0
+        self._gc_was_enabled    = gc.isenabled()
+        self._next_collect      = 0.0
+
+    def _apply(self, setting, function):
+        try:
+            detail = function()
+            self.applied[setting] = (True, detail)
+        except (OSError, AttributeError, ValueError) as e:
+            self.applied[setting] = (False, "{}: {}".format(type(e).__name__, e))
+
+    def _freeze(self):
+        gc.collect()
+        gc.freeze()
+        return "{} objects frozen".format(gc.get_freeze_count())
+
+    def _disable_gc(self):
+        if self.gc_mode not in ["defer", "off"]:
+            raise ValueError("unknown gc_mode " + str(self.gc_mode))
+        gc.disable()
+        if self.gc_mode == "defer":
+            return "collected in idle polls every {} s".format(self.collect_interval)
+        return "no collection until the adapter stops"
+
+    def _pin(self):
+        cpus = sorted(os.sched_getaffinity(0))
+        # Core 0 handles most interrupts on a Raspberry Pi, so the last
+        # core is used by default.
+        cpu = cpus[-1] if self.cpu is None else self.cpu
+        os.sched_setaffinity(0, {cpu})
+        return "core {}".format(cpu)
+
+    def _fifo(self):
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+        return "priority {}".format(self.priority)
+
+    def _nice(self):
+        os.setpriority(os.PRIO_PROCESS, 0, self.niceness)
+        return "niceness {}".format(self.niceness)
+
+    def enter(self):
+        """
+        Applies the real-time settings to the calling thread / process.
+        Call this from the thread that runs the adapter loop, after the
+        ports were opened.
+
+        Returns
+        -------
+        applied : dict
+            For every setting a tuple of (applied, detail).
+
+        """
+        self._gc_was_enabled = gc.isenabled()
+        self._apply("gc.freeze", self._freeze)
+        self._apply("gc.disable", self._disable_gc)
+        self._apply("cpu affinity", self._pin)
+        self._apply("SCHED_FIFO", self._fifo)
+        self.fifo = self.applied["SCHED_FIFO"][0]
+        if not self.fifo:
+            self._apply("niceness", self._nice)
+        self._next_collect = time.perf_counter() + self.collect_interval
+        return self.applied
+
+    def idle(self):
+        """
+        Gives the deferred garbage collection a chance to run. Call this
+        whenever the adapter loop found no message to process.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.gc_mode == "defer":
+            now = time.perf_counter()
+            if now >= self._next_collect:
+                gc.collect(self.collect_generation)
+                self.collections += 1
+                self._next_collect = now + self.collect_interval
+        if self.fifo:
+            time.sleep(self.idle_sleep)
+
+    def exit(self):
+        """
+        Gives the garbage collection back to Python. Scheduling and CPU
+        affinity are left as they are, as they end with the thread.
+
+        Returns
+        -------
+        None.
+
+        """
+        gc.unfreeze()
+        if self._gc_was_enabled:
+            gc.enable()
+
+    def print_report(self):
+        """
+        Prints which settings could be applied.
+
+        Returns
+        -------
+        None.
+
+        """
+        print(" Real-time mode:")
+        for setting, (ok, detail) in self.applied.items():
+            print("   {:<14} {:<12} {}".format(setting,
+                                               "applied" if ok else "NOT applied",
+                                               detail))
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def measure_jitter(duration=0.5, period=0.001):
+    """
+    Measures how late the thread wakes up from short sleeps. This is the
+    jitter a MIDI message sees on top of the adapter's processing time.
+
+    Parameters
+    ----------
+    duration : float, optional
+        Length of the measurement in seconds. The default is 0.5.
+    period : float, optional
+        Length of a single sleep in seconds. The default is 0.001.
+
+    Returns
+    -------
+    jitter : dict
+        Median, 99th percentile and maximum of the oversleep in ms.
+
+    """
+    late = []
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        t = time.perf_counter()
+        time.sleep(period)
+        late.append(time.perf_counter() - t - period)
+    late.sort()
+    n = len(late)
+    return {"p50_ms":   late[n // 2] * 1000,
+            "p99_ms":   late[min(n - 1, int(n * 0.99))] * 1000,
+            "max_ms":   late[-1] * 1000}
+
+def print_jitter(label, jitter):
+    """
+    Prints a jitter measurement in one line.
+
+    Parameters
+    ----------
+    label : string
+        Name of the measurement, e.g. "before".
+    jitter : dict
+        As returned by measure_jitter().
+
+    Returns
+    -------
+    None.
+
+    """
+    print("   Jitter {:<7} p50 {:.3f} ms, p99 {:.3f} ms, max {:.3f} ms".format(
+        label + ":", jitter["p50_ms"], jitter["p99_ms"], jitter["max_ms"]))
+
+def enter_realtime(measure=True, **kwargs):
+    """
+    Creates a RealtimeMode, applies it and prints a report including the
+    jitter before and after.
+
+    Parameters
+    ----------
+    measure : bool, optional
+        Measure the jitter before and after. The default is True.
+    **kwargs
+        Passed on to RealtimeMode.
+
+    Returns
+    -------
+    rt : RealtimeMode
+        The applied mode. Call rt.idle() in the loop and rt.exit() at the end.
+
+    """
+    rt = RealtimeMode(**kwargs)
+    if measure:
+        before = measure_jitter()
+    rt.enter()
+    rt.print_report()
+    if measure:
+        after = measure_jitter()
+        print_jitter("before", before)
+        print_jitter("after", after)
+    return rt
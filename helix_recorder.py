@@ -0,0 +1,215 @@
+import os
+import signal
+import time
+from array import array
+
+
+#############################################################################
+############### - EVENT KINDS - #############################################
+#############################################################################
+
+# Every record is (time, kind, a, b, c) with a, b, c in 0,...,255.
+REC_IN          = 1     # MIDI in:         status, data1, data2
+REC_OUT         = 2     # CC to the Helix: parameter, VALUE
+REC_VOICE       = 3     # voice pick:      oscillator, note, velocity
+REC_STEAL       = 4     # voice steal:     oscillator, old note, new note
+REC_RELEASE     = 5     # voice off:       oscillator, note
+REC_BYPASS      = 6     # 3NG bypass:      1 on / 0 off
+REC_PRESET      = 7     # preset switch:   program
+REC_STOP        = 8     # adapter stops:   reason, see STOP_REASONS
+REC_RESYNC      = 9     # resync of 3NG:   CC parameter or 128 + program
+
+STOP_REASONS    = {"cc_off": 1}
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class FlightRecorder:
+    """
+    Ring buffer of the last MIDI traffic and decisions of the adapter,
+    kept in memory and written to a file only on demand.
+
+    All records live in arrays allocated up front (one array per field), so
+    record() writes a few numbers and never grows anything. When the ring
+    is full, the oldest records are overwritten.
+    """
+    def __init__(self, size=4096, directory="."):
+        self.size       = size
+        self.directory  = directory
+        self.times      = array("d", bytes(8 * size))
+        self.kinds      = bytearray(size)
+        self.a          = bytearray(size)
+        self.b          = bytearray(size)
+        self.c          = bytearray(size)
+        self.count      = 0
+        self.requested  = False
+        self.dumps      = 0
+        self._i         = 0
+
+    def record(self, kind, a=0, b=0, c=0):
+        """
+        Adds one record.
+
+        Parameters
+        ----------
+        kind : int
+            One of the REC_* kinds.
+        a, b, c : int, optional
+            Fields of the record (0,...,255), see the REC_* kinds.
+
+        Returns
+        -------
+        None.
+
+        """
+        i = self._i
+        self.times[i]   = time.perf_counter()
+        self.kinds[i]   = kind
+        self.a[i]       = a
+        self.b[i]       = b
+        self.c[i]       = c
+        i += 1
+        self._i = 0 if i == self.size else i
+        self.count += 1
+
+    def request(self, signum=None, frame=None):
+        """
+        Asks for a dump at the next convenient moment of the adapter loop.
+        Usable as a signal handler.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.requested = True
+
+    def install_signal(self, signum=getattr(signal, "SIGUSR1", None)):
+        """
+        Requests a dump whenever the process receives a signal. Has to be
+        called from the main thread.
+
+        Parameters
+        ----------
+        signum : int, optional
+            The signal. The default is SIGUSR1 (not available on Windows).
+
+        Returns
+        -------
+        bool
+            Whether the handler could be installed.
+
+        """
+        if signum is None:
+            return False
+        try:
+            signal.signal(signum, self.request)
+        except ValueError:
+            # Not the main thread.
+            return False
+        return True
+
+    def records(self):
+        """
+        Copies the records out of the ring, oldest first.
+
+        Returns
+        -------
+        list of tuple
+            (time, kind, a, b, c) per record.
+
+        """
+        n = min(self.count, self.size)
+        start = (self._i - n) % self.size
+        out = []
+        for k in range(n):
+            i = (start + k) % self.size
+            out.append((self.times[i], self.kinds[i], self.a[i], self.b[i], self.c[i]))
+        return out
+
+    def dump(self, reason="request", path=None):
+        """
+        Writes the records to a text file, with the time in seconds before
+        the newest record.
+
+        Parameters
+        ----------
+        reason : string, optional
+            Why the dump was written, goes into the first line.
+            The default is "request".
+        path : string, optional
+            File to write. The default is a file named after the date and
+            time in the recorder's directory.
+
+        Returns
+        -------
+        path : string
+            The written file.
+
+        """
+        self.requested = False
+        records = self.records()
+        if path is None:
+            path = os.path.join(self.directory, "helix_flight_{}_{}.txt".format(
+                time.strftime("%Y%m%d_%H%M%S"), self.dumps))
+        end = records[-1][0] if records else 0.0
+        with open(path, "w") as f:
+            f.write("# Helix adapter flight recorder, {}, {} of {} events\n".format(
+                reason, len(records), self.count))
+            for t, kind, a, b, c in records:
+                f.write("{:>11.6f}  {}\n".format(t - end, format_record(kind, a, b, c)))
+        self.dumps += 1
+        print(" Flight recorder: {} events written to {}.".format(len(records), path))
+        return path
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def format_record(kind, a, b, c):
+    """
+    Describes one record in a line of text.
+
+    Parameters
+    ----------
+    kind : int
+        One of the REC_* kinds.
+    a, b, c : int
+        Fields of the record.
+
+    Returns
+    -------
+    string
+        Description of the record.
+
+    """
+    if kind == REC_IN:
+        status = a & 0xF0
+        name = {0x80: "NOTE OFF", 0x90: "NOTE ON", 0xB0: "CC", 0xC0: "PROGRAM",
+                0xD0: "AFTERTOUCH", 0xE0: "PITCH BEND"}.get(status, "?")
+        if status == 0x90 and c == 0:
+            name = "NOTE OFF"
+        return "IN       {:02X} {:02X} {:02X}  {} ch{}".format(a, b, c, name, (a & 0x0F) + 1)
+    if kind == REC_OUT:
+        return "OUT      CC{} = {}".format(a, b)
+    if kind == REC_VOICE:
+        return "VOICE    OSC{} plays note {} (velocity {})".format(a + 1, b, c)
+    if kind == REC_STEAL:
+        return "STEAL    OSC{} drops note {} for note {}".format(a + 1, b, c)
+    if kind == REC_RELEASE:
+        return "RELEASE  OSC{} note {}".format(a + 1, b)
+    if kind == REC_BYPASS:
+        return "BYPASS   3NG {}".format("on" if a else "off")
+    if kind == REC_PRESET:
+        return "PRESET   program {}".format(a)
+    if kind == REC_RESYNC:
+        if a >= 128:
+            return "RESYNC   after program change {}".format(a - 128)
+        return "RESYNC   after CC{}".format(a)
+    if kind == REC_STOP:
+        reasons = {v: k for k, v in STOP_REASONS.items()}
+        return "STOP     {}".format(reasons.get(a, a))
+    return "?        {} {} {} {}".format(kind, a, b, c)
@@ -0,0 +1,415 @@
+import argparse
+import contextlib
+import gc
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+import mido as md
+
+from functions import HelixOscillator, helix_polysynth, helix_monosynth
+from helix_emulator import Helix3NGEmulator
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class SoakInport:
+    """
+    Fake inport that feeds the adapter with randomized note, CC and clock
+    traffic for a given time and then sends the cc_off CC to stop it.
+
+    The adapter loops poll their inports, process one message and poll
+    again. The time between handing out a message and the next poll is
+    therefore the processing time of that message, which is collected as
+    its latency.
+
+    Every sample_interval seconds, memory and latency figures are sampled
+    into self.samples.
+    """
+    def __init__(self, duration     = 60,
+                 rate               = 500,
+                 clock_bpm          = 120,
+                 sample_interval    = 5,
+                 midi_channel       = 0,
+                 cc_off             = 18,
+                 max_keys           = 8,
+                 seed               = None,
+                 trace              = True
+                 ):
+        self.duration           = duration
+        self.rate               = rate
+        self.clock_step         = 60 / (clock_bpm * 24) if clock_bpm else None
+        self.sample_interval    = sample_interval
+        self.midi_channel       = midi_channel
+        self.cc_off             = cc_off
+        self.max_keys           = max_keys
+        self.random             = random.Random(seed)
+        self.trace              = trace
+        self.closed             = False
+
+        self.held       = []
+        self.sent       = 0
+        self.latencies  = []
+        self.samples    = []
+        self.snapshots  = []
+        # CCs that are sent as random controller traffic. cc_off stays out,
+        # it is only sent to end the run.
+        self.cc_pool    = [x for x in [1,7,10,11,64,71,74] if x != cc_off]
+
+        self._t_msg     = None
+        self._start     = None
+
+    def _start_run(self, now):
+        self._start         = now
+        self._end           = now + self.duration
+        self._next_event    = now
+        self._next_clock    = now
+        self._next_sample   = now
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _random_message(self):
+        # Hold at most max_keys keys (more than the three voices, so voices
+        # get taken over) and only release keys that are actually held.
+        r = self.random.random()
+        if self.held and (r < 0.4 or len(self.held) >= self.max_keys):
+            note = self.held.pop(self.random.randrange(len(self.held)))
+            return md.Message('note_off', channel=self.midi_channel,
+                              note=note, velocity=0)
+        if r < 0.8:
+            note = self.random.randint(24, 96)
+            while note in self.held:
+                note = self.random.randint(24, 96)
+            self.held.append(note)
+            return md.Message('note_on', channel=self.midi_channel,
+                              note=note, velocity=self.random.randint(1, 127))
+        return md.Message('control_change', channel=self.midi_channel,
+                          control=self.random.choice(self.cc_pool),
+                          value=self.random.randint(0, 127))
+
+    def sample(self, now):
+        """
+        Samples memory, object counts and the latencies of the last window.
+
+        Parameters
+        ----------
+        now : float
+            perf_counter() time of the sample.
+
+        Returns
+        -------
+        None.
+
+        """
+        # Collect first, so only live objects are counted.
+        gc.collect()
+        objects     = gc.get_objects()
+        n_osc       = sum(1 for o in objects if isinstance(o, HelixOscillator))
+        n_objects   = len(objects)
+        del objects
+
+        lat = sorted(self.latencies)
+        self.latencies = []
+        if self.trace and tracemalloc.is_tracing():
+            traced = tracemalloc.get_traced_memory()[0] / 1024
+            # The baseline snapshot goes with the first sample after warm-up.
+            if not self.snapshots and len(self.samples) == 1:
+                self.snapshots.append(tracemalloc.take_snapshot())
+        else:
+            traced = None
+
+        self.samples.append({
+            "time":         now - self._start,
+            "messages":     self.sent,
+            "rss_kb":       rss_kb(),
+            "traced_kb":    traced,
+            "objects":      n_objects,
+            "oscillators":  n_osc,
+            "p50_ms":       percentile(lat, 50) * 1000,
+            "p99_ms":       percentile(lat, 99) * 1000,
+            "max_ms":       lat[-1] * 1000 if lat else 0.0,
+            })
+
+    def poll(self):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start_run(now)
+        if self._t_msg is not None:
+            self.latencies.append(now - self._t_msg)
+            self._t_msg = None
+
+        if now >= self._next_sample:
+            self.sample(now)
+            self._next_sample += self.sample_interval
+            now = time.perf_counter()
+
+        if now >= self._end:
+            if self.trace and tracemalloc.is_tracing():
+                self.snapshots.append(tracemalloc.take_snapshot())
+            return md.Message('control_change', channel=self.midi_channel,
+                              control=self.cc_off, value=127)
+
+        if self.clock_step is not None and now >= self._next_clock:
+            self._next_clock += self.clock_step
+            msg = md.Message('clock')
+        elif now >= self._next_event:
+            self._next_event += self.random.expovariate(self.rate)
+            msg = self._random_message()
+        else:
+            return None
+
+        self.sent += 1
+        self._t_msg = time.perf_counter()
+        return msg
+
+    def close(self):
+        self.closed = True
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def rss_kb():
+    """
+    Resident set size of this process.
+
+    Returns
+    -------
+    float
+        RSS in kB. Falls back to the peak RSS where /proc is not available.
+
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024
+    except (OSError, ValueError, AttributeError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux reports kB.
+        return peak / 1024 if sys.platform == "darwin" else peak
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Parameters
+    ----------
+    values : list of float
+        Sorted values.
+    p : float
+        Percentile (0,...,100).
+
+    Returns
+    -------
+    float
+        The percentile, or 0.0 for an empty list.
+
+    """
+    if not values:
+        return 0.0
+    k = max(0, min(len(values) - 1, int(round(p / 100 * len(values))) - 1))
+    return values[k]
+
+def soak_report(samples, snapshots=None, warmup=1,
+                growth_kb=1024, growth_objects=1000, slowdown=1.5):
+    """
+    Compares the first sample after the warm-up with the last sample and
+    flags memory growth. For latency, the median p99 of the first and the
+    last quarter of the run are compared, so a single slow window does not
+    count as a slowdown.
+
+    Parameters
+    ----------
+    samples : list of dict
+        Samples as collected by SoakInport.
+    snapshots : list of tracemalloc snapshots, optional
+        First and last snapshot of the run. If given, the allocation sites
+        that grew the most are reported. The default is None.
+    warmup : int, optional
+        Number of samples that are skipped as warm-up. The default is 1.
+    growth_kb : float, optional
+        RSS or traced memory growth in kB that is flagged. The default is 1024.
+    growth_objects : int, optional
+        Growth of the number of objects that is flagged. The default is 1000.
+    slowdown : float, optional
+        Factor by which p99 latency may grow before it is flagged.
+        The default is 1.5.
+
+    Returns
+    -------
+    report : dict
+        Baseline and last sample, growth figures and a list of flags.
+
+    """
+    if len(samples) < warmup + 2:
+        warmup = 0
+    if len(samples) < 2:
+        return {"flags": ["Not enough samples for a report."], "samples": samples}
+
+    first   = samples[warmup]
+    last    = samples[-1]
+    hours   = max(last["time"] - first["time"], 1e-9) / 3600
+    flags   = []
+
+    growth = {
+        "rss_kb":       last["rss_kb"] - first["rss_kb"],
+        "objects":      last["objects"] - first["objects"],
+        "oscillators":  last["oscillators"] - first["oscillators"],
+        }
+    if first["traced_kb"] is not None and last["traced_kb"] is not None:
+        growth["traced_kb"] = last["traced_kb"] - first["traced_kb"]
+
+    if growth["rss_kb"] > growth_kb:
+        flags.append("RSS grew by {:.0f} kB ({:.0f} kB/h).".format(
+            growth["rss_kb"], growth["rss_kb"] / hours))
+    if growth.get("traced_kb", 0) > growth_kb:
+        flags.append("Traced memory grew by {:.0f} kB ({:.0f} kB/h).".format(
+            growth["traced_kb"], growth["traced_kb"] / hours))
+    if growth["objects"] > growth_objects:
+        flags.append("Object count grew by {}.".format(growth["objects"]))
+    if growth["oscillators"] > 0:
+        flags.append("{} HelixOscillator objects were leaked.".format(
+            growth["oscillators"]))
+    run     = samples[warmup:]
+    quarter = max(1, len(run) // 4)
+    p99_first   = percentile(sorted(s["p99_ms"] for s in run[:quarter]), 50)
+    p99_last    = percentile(sorted(s["p99_ms"] for s in run[-quarter:]), 50)
+    if p99_first > 0 and p99_last > slowdown * p99_first:
+        flags.append("p99 latency went from {:.3f} ms to {:.3f} ms.".format(
+            p99_first, p99_last))
+
+    top = []
+    if snapshots is not None and len(snapshots) >= 2:
+        for stat in snapshots[-1].compare_to(snapshots[0], "lineno")[:5]:
+            top.append(str(stat))
+
+    return {"baseline": first, "last": last, "growth": growth,
+            "top_allocations": top, "flags": flags, "samples": samples}
+
+def print_soak_report(report):
+    """
+    Prints a soak report in a readable form.
+
+    Parameters
+    ----------
+    report : dict
+        Report as returned by soak_report().
+
+    Returns
+    -------
+    None.
+
+    """
+    print(" Soak samples:")
+    print("   {:>8} {:>10} {:>10} {:>10} {:>9} {:>9} {:>9}".format(
+        "time/s", "messages", "RSS/kB", "objects", "p50/ms", "p99/ms", "max/ms"))
+    for s in report["samples"]:
+        print("   {:>8.0f} {:>10} {:>10.0f} {:>10} {:>9.3f} {:>9.3f} {:>9.3f}".format(
+            s["time"], s["messages"], s["rss_kb"], s["objects"],
+            s["p50_ms"], s["p99_ms"], s["max_ms"]))
+    for line in report.get("top_allocations", []):
+        print("   " + line)
+    if report["flags"]:
+        for f in report["flags"]:
+            print(" WARNING: " + f)
+    else:
+        print(" No growth or slowdown detected.")
+
+def helix_soak(mode             = "poly",
+               duration         = 60,
+               rate             = 500,
+               clock_bpm        = 120,
+               sample_interval  = 5,
+               interval1        = 0,
+               interval2        = 7,
+               seed             = None,
+               trace            = True,
+               quiet            = True
+               ):
+    """
+    Runs helix_polysynth() or helix_monosynth() against randomized traffic
+    and a Helix3NGEmulator for a given time and reports memory and latency
+    drift.
+
+    Parameters
+    ----------
+    mode : string, optional
+        "poly" or "mono". The default is "poly".
+    duration : float, optional
+        Length of the run in seconds. The default is 60.
+    rate : float, optional
+        Mean number of note and CC messages per second. The default is 500.
+    clock_bpm : float, optional
+        Tempo of the MIDI clock that is sent in addition (24 clocks per
+        beat). 0 sends no clock. The default is 120.
+    sample_interval : float, optional
+        Seconds between two samples. The default is 5.
+    interval1 : int, optional
+        Interval for OSC2 in mono mode. The default is 0.
+    interval2 : int, optional
+        Interval for OSC3 in mono mode. The default is 7.
+    seed : int, optional
+        Seed for the random traffic. The default is None.
+    trace : bool, optional
+        Track allocations with tracemalloc. This slows the adapter down,
+        so latency figures are only comparable between runs with the same
+        setting. The default is True.
+    quiet : bool, optional
+        Send the adapter's console output to os.devnull. The default is True.
+
+    Returns
+    -------
+    report : dict
+        Report as returned by soak_report().
+
+    """
+    inport  = SoakInport(duration=duration, rate=rate, clock_bpm=clock_bpm,
+                         sample_interval=sample_interval, seed=seed,
+                         trace=trace)
+    helix   = Helix3NGEmulator(max_events=1000)
+
+    print(" Soaking the {}synth adapter for {} s at {} messages/s...".format(
+        mode, duration, rate))
+    with open(os.devnull, "w") as devnull:
+        out = devnull if quiet else sys.stdout
+        with contextlib.redirect_stdout(out):
+            if mode == "poly":
+                helix_polysynth(inports=[inport], outports=[helix])
+            else:
+                helix_monosynth(interval1, interval2,
+                                inports=[inport], outports=[helix])
+    if trace:
+        tracemalloc.stop()
+
+    report = soak_report(inport.samples, inport.snapshots)
+    print_soak_report(report)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak test of the MIDI to HX adapter.")
+    parser.add_argument("--mode", choices=["poly", "mono"], default="poly")
+    parser.add_argument("--duration", type=float, default=60,
+                        help="length of the run in seconds")
+    parser.add_argument("--rate", type=float, default=500,
+                        help="note and CC messages per second")
+    parser.add_argument("--clock-bpm", type=float, default=120,
+                        help="tempo of the MIDI clock, 0 for none")
+    parser.add_argument("--sample-interval", type=float, default=5)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-trace", action="store_true",
+                        help="do not track allocations with tracemalloc")
+    args = parser.parse_args()
+    report = helix_soak(mode            = args.mode,
+                        duration        = args.duration,
+                        rate            = args.rate,
+                        clock_bpm       = args.clock_bpm,
+                        sample_interval = args.sample_interval,
+                        seed            = args.seed,
+                        trace           = not args.no_trace)
+    sys.exit(1 if report["flags"] else 0)
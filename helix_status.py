@@ -0,0 +1,319 @@
+import struct
+import time
+from multiprocessing import shared_memory
+
+try:
+    from multiprocessing import resource_tracker
+except ImportError:
+    resource_tracker = None
+
+
+#############################################################################
+############### - SHARED MEMORY LAYOUT - ####################################
+#############################################################################
+
+# Fixed layout of the status board (little endian):
+#
+#   offset  0   magic b"HXSB"
+#   offset  4   layout version, uint16
+#   offset  8   sequence counter, uint32. Odd while the adapter writes.
+#   offset 16   payload, see STATUS_FIELDS
+#
+# Readers copy the payload and check that the sequence counter was even and
+# did not change meanwhile (a seqlock), so the adapter never waits for them.
+STATUS_NAME     = "helix_status"
+STATUS_MAGIC    = b"HXSB"
+STATUS_VERSION  = 1
+STATUS_HEADER   = struct.Struct("<4sH")
+STATUS_SEQ      = struct.Struct("<I")
+STATUS_FIELDS   = ["heartbeat", "running", "mode", "bypass", "keys",
+                   "note1", "note2", "note3",
+                   "level1", "level2", "level3",
+                   "events_in", "frames_out"]
+STATUS_PAYLOAD  = struct.Struct("<d4B3B3BxQQ")
+STATUS_SEQ_AT   = 8
+STATUS_DATA_AT  = 16
+STATUS_SIZE     = STATUS_DATA_AT + STATUS_PAYLOAD.size
+
+NO_NOTE         = 255
+MODES           = {"": 0, "poly": 1, "mono": 2, "chord": 3}
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class StatusBoard:
+    """
+    Fixed-layout block of shared memory that the adapter publishes its state
+    to: the note and level of each voice, the 3NG bypass, the number of held
+    keys and counters. The GUI, a stage display or any other local tool can
+    read it at any rate without talking to the adapter.
+
+    Only one process (the adapter) may write to a board.
+    """
+    def __init__(self, name=STATUS_NAME, create=False):
+        self.name   = name
+        self.owner  = create
+        self._seq   = 0
+        self._beat  = 0.0
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                                   size=STATUS_SIZE)
+            buf = self._shm.buf
+            buf[:STATUS_SIZE] = bytes(STATUS_SIZE)
+            STATUS_HEADER.pack_into(buf, 0, STATUS_MAGIC, STATUS_VERSION)
+        else:
+            self._shm = _attach(name)
+            magic, version = STATUS_HEADER.unpack_from(self._shm.buf, 0)
+            if magic != STATUS_MAGIC or version != STATUS_VERSION:
+                self._shm.close()
+                raise ValueError("{} is no status board of version {}.".format(
+                    name, STATUS_VERSION))
+            self._seq = STATUS_SEQ.unpack_from(self._shm.buf, STATUS_SEQ_AT)[0] & ~1
+        self._buf = self._shm.buf
+
+    def publish(self, oscillators, bypass, keys, events_in, frames_out,
+                mode="", running=True):
+        """
+        Writes the adapter state to the board.
+
+        Parameters
+        ----------
+        oscillators : list of HelixOscillator
+            The three oscillators. A voice with level 0 is shown without
+            a note.
+        bypass : bool
+            Whether the 3NG is switched on.
+        keys : int
+            Number of held keys.
+        events_in : int
+            Number of messages the adapter has processed.
+        frames_out : int
+            Number of updates the adapter has sent to the Helix.
+        mode : string, optional
+            "poly", "mono" or "chord". The default is "".
+        running : bool, optional
+            Whether the adapter loop is running. The default is True.
+
+        Returns
+        -------
+        None.
+
+        """
+        o1, o2, o3 = oscillators
+        self._beat = time.monotonic()
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+        STATUS_PAYLOAD.pack_into(
+            self._buf, STATUS_DATA_AT,
+            self._beat, running, MODES.get(mode, 0), bypass,
+            min(max(keys, 0), 255),
+            o1.octave * 12 + o1.note if o1.volume > 0 else NO_NOTE,
+            o2.octave * 12 + o2.note if o2.volume > 0 else NO_NOTE,
+            o3.octave * 12 + o3.note if o3.volume > 0 else NO_NOTE,
+            o1.volume, o2.volume, o3.volume,
+            events_in, frames_out)
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+
+    def beat(self, interval=0.5):
+        """
+        Refreshes only the heartbeat, at most every interval seconds, so a
+        reader can tell an idle adapter from a hanging one. Cheap enough to
+        be called on every idle poll.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Minimum time between two heartbeats. The default is 0.5.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.monotonic()
+        if now - self._beat < interval:
+            return
+        self._beat = now
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+        struct.pack_into("<d", self._buf, STATUS_DATA_AT, now)
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+
+    def stop(self):
+        """
+        Marks the adapter as stopped, keeping the last state.
+
+        Returns
+        -------
+        None.
+
+        """
+        state = self.read()
+        if state is None:
+            return
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+        struct.pack_into("<B", self._buf, STATUS_DATA_AT + 8, 0)
+        self._seq += 1
+        STATUS_SEQ.pack_into(self._buf, STATUS_SEQ_AT, self._seq & 0xFFFFFFFF)
+
+    def read(self, retries=100):
+        """
+        Reads a consistent copy of the board.
+
+        Parameters
+        ----------
+        retries : int, optional
+            How often to retry if the adapter was writing meanwhile.
+            The default is 100.
+
+        Returns
+        -------
+        state : dict or None
+            The fields of STATUS_FIELDS, with notes as MIDI note VALUE or
+            None. Also "age", the seconds since the last publish. None if no
+            consistent copy could be read.
+
+        """
+        for i in range(retries):
+            before = STATUS_SEQ.unpack_from(self._buf, STATUS_SEQ_AT)[0]
+            if before & 1:
+                continue
+            values = STATUS_PAYLOAD.unpack_from(self._buf, STATUS_DATA_AT)
+            after = STATUS_SEQ.unpack_from(self._buf, STATUS_SEQ_AT)[0]
+            if before == after:
+                state = dict(zip(STATUS_FIELDS, values))
+                for n in ["note1", "note2", "note3"]:
+                    if state[n] == NO_NOTE:
+                        state[n] = None
+                state["age"] = time.monotonic() - state["heartbeat"]
+                return state
+        return None
+
+    def close(self):
+        """
+        Detaches from the board. The owner also removes it.
+
+        Returns
+        -------
+        None.
+
+        """
+        self._buf = None
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def _attach(name):
+    # Before Python 3.13, attaching registers the block with the resource
+    # tracker, which removes it when this process ends, even though another
+    # process owns it. A process started by the owner shares the owner's
+    # tracker, where the registration changes nothing. Only a tracker that
+    # was started for this attach has to forget the block again.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        tracker = getattr(resource_tracker, "_resource_tracker", None)
+        own_tracker = tracker is not None and getattr(tracker, "_fd", 0) is None
+        shm = shared_memory.SharedMemory(name=name)
+        if own_tracker:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm
+
+def open_board(name=STATUS_NAME):
+    """
+    Attaches to a status board, or creates it if it does not exist yet. A
+    created board is removed again by close().
+
+    Parameters
+    ----------
+    name : string, optional
+        Name of the board. The default is STATUS_NAME.
+
+    Returns
+    -------
+    board : StatusBoard
+        The attached or created board.
+
+    """
+    try:
+        return StatusBoard(name)
+    except FileNotFoundError:
+        pass
+    try:
+        return StatusBoard(name, create=True)
+    except FileExistsError:
+        # Another process created it meanwhile.
+        return StatusBoard(name)
+
+def note_name(note):
+    """
+    Name of a MIDI note VALUE with the 3NG octave, e.g. 61 -> "C#5".
+
+    Parameters
+    ----------
+    note : int or None
+        MIDI note VALUE.
+
+    Returns
+    -------
+    string
+        Note name, or "-" for None.
+
+    """
+    if note is None:
+        return "-"
+    return ["C","C#","D","D#","E","F","F#","G","G#","A","A#","B"][note % 12] + str(note // 12)
+
+def format_status(state):
+    """
+    Formats a status board state as a few lines of text.
+
+    Parameters
+    ----------
+    state : dict or None
+        As returned by StatusBoard.read().
+
+    Returns
+    -------
+    string
+        Text for a label or a terminal.
+
+    """
+    if state is None or state["heartbeat"] == 0:
+        return "Adapter not running."
+    lines = ["Adapter {} ({}), 3NG {}, {} keys held".format(
+                "running" if state["running"] else "stopped",
+                {1: "poly", 2: "mono", 3: "chord"}.get(state["mode"], "?"),
+                "on" if state["bypass"] else "off",
+                state["keys"])]
+    for i in [1,2,3]:
+        lines.append("OSC{}: {:<4} level {:>3}".format(
+            i, note_name(state["note{}".format(i)]), state["level{}".format(i)]))
+    lines.append("{} messages in, {} updates out".format(
+        state["events_in"], state["frames_out"]))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Minimal stage display: prints the board of a running adapter. Can be
+    # started before the adapter, which then publishes to the same board.
+    board = open_board()
+    try:
+        while True:
+            print("\033[2J\033[H" + format_status(board.read()), flush=True)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        board.close()
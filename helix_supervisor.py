@@ -0,0 +1,290 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+
+from functions import helix_polysynth, helix_monosynth
+from helix_status import StatusBoard
+
+
+#############################################################################
+############### - CLASSES - #################################################
+#############################################################################
+
+class AdapterSupervisor:
+    """
+    Runs several keyboard -> Helix adapters side by side, each in its own
+    worker process pinned to its own CPU core, so a busy pair cannot add
+    jitter to another one through the GIL.
+
+    An adapter definition is a dict with a "name", the "mode" ("poly" or
+    "mono"), optionally a "cpu", and any further arguments of
+    helix_polysynth() / helix_monosynth(), e.g.
+
+        {"name": "lower", "mode": "poly",
+         "gui_inport": "MPK Mini 1", "gui_outport": "Line 6 Helix 1",
+         "ccocts": [81,86,91], "realtime": true}
+
+    A worker that ends with an error is restarted after restart_delay
+    seconds (doubling with every restart in a row). The new adapter sends
+    its complete state to the Helix on start, so the 3NG is in sync again.
+    A worker that ends cleanly (cc_off) stays stopped.
+
+    Every worker publishes to its own StatusBoard, from which health()
+    collects the metrics of all adapters.
+    """
+    def __init__(self, definitions, restart_delay=1.0, max_delay=30.0,
+                 max_restarts=10, stale_after=2.0):
+        self.restart_delay  = restart_delay
+        self.max_delay      = max_delay
+        self.max_restarts   = max_restarts
+        self.stale_after    = stale_after
+        self.workers        = []
+
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            cpus = list(range(os.cpu_count() or 1))
+        # Leave core 0 to the system and the supervisor if there is a choice.
+        if len(cpus) > 1:
+            cpus = cpus[1:] + cpus[:1]
+
+        names = set()
+        for i, d in enumerate(definitions):
+            d = dict(d)
+            name = d.pop("name", "adapter{}".format(i + 1))
+            if name in names:
+                raise ValueError("Adapter name {!r} is used twice.".format(name))
+            names.add(name)
+            mode = d.pop("mode", "poly")
+            if mode not in ["poly", "mono"]:
+                raise ValueError("Adapter {!r} has unknown mode {!r}.".format(name, mode))
+            cpu = d.pop("cpu", cpus[i % len(cpus)])
+            self.workers.append({"name":        name,
+                                 "mode":        mode,
+                                 "cpu":         cpu,
+                                 "kwargs":      d,
+                                 "board_name":  "helix_status_{}".format(name),
+                                 "board":       None,
+                                 "process":     None,
+                                 "restarts":    0,
+                                 "failures":    0,
+                                 "next_start":  0.0,
+                                 "finished":    False,
+                                 "exitcode":    None})
+
+    def _start(self, w):
+        w["process"] = mp.Process(target=_worker, name=w["name"],
+                                  args=(w["mode"], w["kwargs"], w["board_name"], w["cpu"]))
+        w["process"].start()
+        print(" Started adapter {} (pid {}) on core {}.".format(
+            w["name"], w["process"].pid, w["cpu"]))
+
+    def start(self):
+        """
+        Creates the status boards and starts all workers.
+
+        Returns
+        -------
+        None.
+
+        """
+        for w in self.workers:
+            try:
+                w["board"] = StatusBoard(w["board_name"], create=True)
+            except FileExistsError:
+                # Left over from a crashed supervisor.
+                w["board"] = StatusBoard(w["board_name"])
+                w["board"].owner = True
+            self._start(w)
+
+    def check(self):
+        """
+        Restarts failed workers whose restart delay has passed.
+
+        Returns
+        -------
+        bool
+            True while at least one adapter is running or waiting for its
+            restart.
+
+        """
+        now = time.monotonic()
+        active = False
+        for w in self.workers:
+            p = w["process"]
+            if w["finished"]:
+                continue
+            if p is not None and p.is_alive():
+                # Running long enough without failure resets the back-off.
+                if now - w["next_start"] > self.max_delay:
+                    w["failures"] = 0
+                active = True
+                continue
+            if p is not None:
+                p.join()
+                w["exitcode"] = p.exitcode
+                w["process"] = None
+                if p.exitcode == 0:
+                    print(" Adapter {} stopped.".format(w["name"]))
+                    w["finished"] = True
+                    continue
+                if w["restarts"] >= self.max_restarts:
+                    print(" Adapter {} failed (exit code {}), giving up after {} restarts.".format(
+                        w["name"], p.exitcode, w["restarts"]))
+                    w["finished"] = True
+                    continue
+                delay = min(self.restart_delay * 2 ** w["failures"], self.max_delay)
+                w["failures"] += 1
+                w["next_start"] = now + delay
+                print(" Adapter {} failed (exit code {}), restarting in {:.1f} s.".format(
+                    w["name"], p.exitcode, delay))
+            active = True
+            if now >= w["next_start"]:
+                w["restarts"] += 1
+                w["next_start"] = now
+                self._start(w)
+        return active
+
+    def health(self):
+        """
+        Collects the state of all adapters.
+
+        Returns
+        -------
+        list of dict
+            Per adapter: name, pid, alive, restarts, last exit code, whether
+            the heartbeat is stale, and the status board fields.
+
+        """
+        report = []
+        for w in self.workers:
+            p = w["process"]
+            state = w["board"].read() if w["board"] is not None else None
+            alive = p is not None and p.is_alive()
+            entry = {"name":        w["name"],
+                     "pid":         p.pid if p is not None else None,
+                     "cpu":         w["cpu"],
+                     "alive":       alive,
+                     "restarts":    w["restarts"],
+                     "exitcode":    w["exitcode"],
+                     "stale":       alive and (state is None
+                                               or state["age"] > self.stale_after)}
+            if state is not None:
+                entry.update(state)
+            report.append(entry)
+        return report
+
+    def print_health(self):
+        """
+        Prints one line per adapter.
+
+        Returns
+        -------
+        None.
+
+        """
+        for h in self.health():
+            if h["alive"]:
+                status = "STALE" if h["stale"] else "ok"
+            else:
+                status = "stopped" if h["exitcode"] == 0 else "down"
+            print(" {:<12} {:<7} core {:<2} restarts {:<3} {:>8} in {:>8} out {} keys".format(
+                h["name"], status, h["cpu"], h["restarts"],
+                h.get("events_in", 0), h.get("frames_out", 0), h.get("keys", 0)))
+
+    def stop(self):
+        """
+        Stops all workers and removes the status boards.
+
+        Returns
+        -------
+        None.
+
+        """
+        for w in self.workers:
+            p = w["process"]
+            if p is not None and p.is_alive():
+                p.terminate()
+                p.join()
+            w["finished"] = True
+            if w["board"] is not None:
+                w["board"].close()
+                w["board"] = None
+
+    def run(self, interval=1.0, report_every=10.0):
+        """
+        Starts all adapters and supervises them until all of them stopped
+        or Ctrl+C is pressed.
+
+        Parameters
+        ----------
+        interval : float, optional
+            Seconds between two checks. The default is 1.0.
+        report_every : float, optional
+            Seconds between two health reports. The default is 10.0.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.start()
+        next_report = time.monotonic() + report_every
+        try:
+            while self.check():
+                if time.monotonic() >= next_report:
+                    self.print_health()
+                    next_report += report_every
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print(" Stopping all adapters...")
+        finally:
+            self.print_health()
+            self.stop()
+
+
+#############################################################################
+############### - FUNCTIONS - ###############################################
+#############################################################################
+
+def _worker(mode, kwargs, board_name, cpu):
+    try:
+        os.sched_setaffinity(0, {cpu})
+    except (AttributeError, OSError) as e:
+        print(" Could not pin the adapter to core {} ({}).".format(cpu, e))
+    if mode == "poly":
+        helix_polysynth(status_board=board_name, **kwargs)
+    else:
+        helix_monosynth(status_board=board_name, **kwargs)
+
+def load_definitions(path):
+    """
+    Reads adapter definitions from a JSON file holding a list of them.
+
+    Parameters
+    ----------
+    path : string
+        Path of the JSON file.
+
+    Returns
+    -------
+    list of dict
+        The adapter definitions.
+
+    """
+    with open(path) as f:
+        definitions = json.load(f)
+    if isinstance(definitions, dict):
+        definitions = definitions["adapters"]
+    return definitions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs several MIDI to HX adapters.")
+    parser.add_argument("definitions", help="JSON file with a list of adapter definitions")
+    parser.add_argument("--report-every", type=float, default=10.0,
+                        help="seconds between two health reports")
+    args = parser.parse_args()
+    AdapterSupervisor(load_definitions(args.definitions)).run(report_every=args.report_every)
@@ -0,0 +1,162 @@
+import time
+
+import pytest
+
+from functions import HelixEngine, HelixPreset
+from helix_emulator import Helix3NGEmulator
+
+
+#############################################################################
+############### - HELPERS - #################################################
+#############################################################################
+
+def play(engine, helix, *messages):
+    """
+    Runs (status, data1, data2) messages through the engine into the
+    emulated 3NG and returns the CC bytes that were sent.
+    """
+    out = bytearray()
+    for status, data1, data2 in messages:
+        data = bytes(engine.process(status, data1, data2, time.perf_counter()))
+        helix.send_bytes(data)
+        out += data
+    return out
+
+def cc_pairs(data):
+    return [(data[i + 1], data[i + 2]) for i in range(0, len(data), 3)]
+
+
+#############################################################################
+############### - VOICES - ##################################################
+#############################################################################
+
+def test_poly_more_than_three_keys():
+    engine = HelixEngine(mode="poly")
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0x90, 48, 100), (0x90, 60, 100), (0x90, 72, 100))
+    assert sorted(helix.sounding()) == [48, 60, 72]
+    # Lowest, highest and the most recent key.
+    play(engine, helix, (0x90, 64, 100))
+    assert sorted(helix.sounding()) == [48, 64, 72]
+    play(engine, helix, (0x90, 67, 100))
+    assert sorted(helix.sounding()) == [48, 67, 72]
+    play(engine, helix, (0x90, 36, 100))
+    assert sorted(helix.sounding()) == [36, 67, 72]
+
+def test_poly_revoice_on_release():
+    engine = HelixEngine(mode="poly")
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0x90, 48, 100), (0x90, 60, 100), (0x90, 72, 100),
+         (0x90, 64, 100))
+    assert sorted(helix.sounding()) == [48, 64, 72]
+    # The released key's oscillator goes back to a held key.
+    play(engine, helix, (0x80, 64, 0))
+    assert sorted(helix.sounding()) == [48, 60, 72]
+    play(engine, helix, (0x80, 72, 0))
+    assert sorted(helix.sounding()) == [48, 60]
+    play(engine, helix, (0x80, 48, 0), (0x80, 60, 0))
+    assert helix.sounding() == []
+
+
+#############################################################################
+############### - BYPASS - ##################################################
+#############################################################################
+
+@pytest.mark.parametrize("mode", ["mono", "chord"])
+def test_bypass(mode):
+    engine = HelixEngine(mode=mode, interval1=7, interval2=12)
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0x90, 60, 100))
+    assert helix.on
+    assert sorted(helix.sounding()) == [60, 67, 72]
+    # Legato: the 3NG stays on while another key takes over.
+    play(engine, helix, (0x90, 62, 100), (0x80, 60, 0))
+    assert helix.on
+    assert sorted(helix.sounding()) == [62, 69, 74]
+    play(engine, helix, (0x80, 62, 0))
+    assert not helix.on
+    assert helix.sounding() == []
+
+def test_chord_preset_voicings():
+    presets = {0: HelixPreset("Fifths", "chord", 7, 12),
+               1: HelixPreset("Triads", "chord", 7, 12, chords={"C": [0, 4, 7]})}
+    engine = HelixEngine(mode="chord", presets=presets)
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0xC0, 1, 0), (0x90, 60, 100))
+    assert sorted(helix.sounding()) == [60, 64, 67]
+    # The held key takes the voicing of the new preset.
+    play(engine, helix, (0xC0, 0, 0))
+    assert sorted(helix.sounding()) == [60, 67, 72]
+
+
+#############################################################################
+############### - PRESETS - #################################################
+#############################################################################
+
+def test_preset_sends_only_differences():
+    presets = {0: HelixPreset("Saw", "poly", shape="saw_up", glide=10),
+               1: HelixPreset("Sine", "poly", shape="sine", glide=10),
+               2: HelixPreset("Sine", "poly", shape="sine", glide=10)}
+    engine = HelixEngine(mode="poly", presets=presets)
+    helix = Helix3NGEmulator()
+    first = cc_pairs(play(engine, helix, (0xC0, 0, 0)))
+    assert set([(cc, 0) for cc in [80, 85, 90]]
+               + [(cc, 10) for cc in [84, 89, 94]]) <= set(first)
+    # Only the shapes change, the glide is already there.
+    second = cc_pairs(play(engine, helix, (0xC0, 1, 0)))
+    assert sorted(second) == [(80, 126), (85, 126), (90, 126)]
+    assert play(engine, helix, (0xC0, 2, 0)) == b""
+
+def test_preset_keeps_sounding_voices():
+    presets = {0: HelixPreset("Saw", "poly", shape="saw_up"),
+               1: HelixPreset("Sine", "poly", shape="sine")}
+    engine = HelixEngine(mode="poly", presets=presets)
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0xC0, 0, 0), (0x90, 60, 100), (0x90, 64, 100))
+    play(engine, helix, (0xC0, 1, 0))
+    assert sorted(helix.sounding()) == [60, 64]
+
+
+#############################################################################
+############### - RESYNC - ##################################################
+#############################################################################
+
+def test_resync_stays_paced():
+    engine = HelixEngine(mode="mono", interval1=7, interval2=12, cc_snapshot=69,
+                         resync_delay=0.0, resync_interval=0.0)
+    helix = Helix3NGEmulator()
+    play(engine, helix, (0x90, 60, 100))
+    engine.helix_message(0xB0, 69, 0)
+    # A message in between must not send the whole state at once.
+    assert play(engine, helix, (0xF8, 0, 0)) == b""
+    steps = []
+    now = time.perf_counter()
+    for k in range(10):
+        data = bytes(engine.tick(now + k))
+        if data:
+            steps.append(cc_pairs(data))
+    # One oscillator per step, mono switches the 3NG on last.
+    assert len(steps) == 4
+    assert [pairs[0][0] for pairs in steps[:3]] == [81, 86, 91]
+    assert steps[3] == [(77, 127)]
+    assert not engine.resyncing
+
+@pytest.mark.parametrize("glide", [None, 20])
+def test_resync_keeps_controlled_glide(glide):
+    engine = HelixEngine(mode="poly", modwheel="glide", glide=glide, cc_snapshot=69,
+                         resync_delay=0.0, resync_interval=0.0)
+    helix = Helix3NGEmulator()
+    helix.send_bytes(bytes(engine.resync()))
+    play(engine, helix, (0xB0, 1, 100))
+    now = time.perf_counter()
+    helix.send_bytes(bytes(engine.tick(now + 1)))
+    assert [o.glide for o in helix.oscillators] == [100, 100, 100]
+    # The Helix loads a snapshot: the mod wheel's glide comes back.
+    helix.reset()
+    engine.helix_message(0xB0, 69, 0)
+    for k in range(2, 10):
+        helix.send_bytes(bytes(engine.tick(now + k)))
+    assert [o.glide for o in helix.oscillators] == [100, 100, 100]
+    helix.reset()
+    helix.send_bytes(bytes(engine.resync()))
+    assert [o.glide for o in helix.oscillators] == [100, 100, 100]
@@ -0,0 +1,57 @@
+from helix_controllers import ControllerThinner
+
+
+#############################################################################
+############### - THINNING - ################################################
+#############################################################################
+
+def test_deadband():
+    thinner = ControllerThinner({"modwheel": (4, 0.0, 0)})
+    thinner.submit("modwheel", 50)
+    assert thinner.flush(0.0) == [("modwheel", 50)]
+    # Small moves are dropped, not kept for later.
+    thinner.submit("modwheel", 53)
+    assert thinner.flush(1.0) == []
+    assert thinner.pending == 0
+    thinner.submit("modwheel", 46)
+    assert thinner.flush(2.0) == [("modwheel", 46)]
+
+def test_rate_cap_flushes_later():
+    thinner = ControllerThinner({"bend": (1, 0.005, 0)})
+    thinner.submit("bend", 100)
+    assert thinner.flush(0.0) == [("bend", 100)]
+    # Held back by the rate cap, last value wins.
+    thinner.submit("bend", 200)
+    thinner.submit("bend", 300)
+    assert thinner.flush(0.001) == []
+    assert thinner.pending == 1
+    assert thinner.flush(0.006) == [("bend", 300)]
+    assert thinner.pending == 0
+    assert thinner.flush(0.020) == []
+    assert (thinner.received, thinner.forwarded) == (3, 2)
+
+def test_resting_value_passes():
+    thinner = ControllerThinner({"bend": (1000, 0.0, 0)})
+    thinner.submit("bend", 5000)
+    assert thinner.flush(0.0) == [("bend", 5000)]
+    thinner.submit("bend", 400)
+    assert thinner.flush(1.0) == [("bend", 400)]
+    # Within the deadband, but the released wheel has to arrive.
+    thinner.submit("bend", 0)
+    assert thinner.flush(2.0) == [("bend", 0)]
+    thinner.submit("bend", 0)
+    assert thinner.flush(3.0) == []
+
+def test_resting_value_waits_for_rate_cap():
+    thinner = ControllerThinner({"aftertouch": (2, 0.010, 0)})
+    thinner.submit("aftertouch", 1)
+    assert thinner.flush(0.0) == [("aftertouch", 1)]
+    thinner.submit("aftertouch", 0)
+    assert thinner.flush(0.005) == []
+    assert thinner.flush(0.011) == [("aftertouch", 0)]
+
+def test_defaults_cover_all_controllers():
+    thinner = ControllerThinner()
+    for key in ["bend", "aftertouch", "modwheel"]:
+        thinner.submit(key, 10)
+    assert sorted(key for key, value in thinner.flush(0.0)) == ["aftertouch", "bend", "modwheel"]
@@ -0,0 +1,74 @@
+import mido as md
+
+from functions import olist, nlist
+from helix_emulator import Helix3NGEmulator
+
+
+#############################################################################
+############### - HELPERS - #################################################
+#############################################################################
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def tune(helix, octave, note):
+    helix.control_change(81, olist[octave])
+    helix.control_change(82, nlist[note])
+
+
+#############################################################################
+############### - EMULATOR - ################################################
+#############################################################################
+
+def test_running_status_and_channel():
+    helix = Helix3NGEmulator()
+    # Running status, split across calls, with a clock byte in between.
+    helix.send_bytes([0xB0, 77, 127, 81, olist[5]])
+    helix.send_bytes([0xF8, 82])
+    helix.send_bytes([nlist[7], 83, 100])
+    assert helix.on
+    assert helix.sounding() == [67]
+    # Other channels and other messages are ignored.
+    helix.send_bytes([0xB1, 83, 0, 0x90, 60, 100])
+    helix.send(md.Message("control_change", channel=2, control=83, value=0))
+    assert helix.sounding() == [67]
+    assert helix.ignored == 3
+
+def test_glitch_windows():
+    clock = Clock()
+    helix = Helix3NGEmulator(clock=clock)
+    helix.control_change(77, 127)
+    tune(helix, 5, 0)
+    helix.control_change(83, 100)
+    # Octave and note CC 0.5 ms apart: C6 sounds for a moment before D6.
+    clock.now = 0.010
+    helix.control_change(81, olist[6])
+    clock.now = 0.0105
+    helix.control_change(82, nlist[2])
+    # A note held longer than the threshold is no glitch.
+    clock.now = 0.100
+    tune(helix, 4, 2)
+    assert [p for t, o, p in helix.sounded()] == [60, 72, 74, 50]
+    glitches = helix.glitch_windows()
+    assert len(glitches) == 1
+    t, o, pitch, duration = glitches[0]
+    assert (t, o, pitch) == (0.010, 0, 72)
+    assert abs(duration - 0.0005) < 1e-9
+    assert helix.glitch_windows(threshold=0.0001) == []
+
+def test_silence_is_no_glitch():
+    clock = Clock()
+    helix = Helix3NGEmulator(clock=clock)
+    helix.control_change(77, 127)
+    tune(helix, 5, 0)
+    helix.control_change(83, 100)
+    clock.now = 0.0005
+    helix.control_change(83, 0)
+    clock.now = 0.001
+    tune(helix, 5, 4)
+    helix.control_change(83, 100)
+    assert helix.glitch_windows() == []
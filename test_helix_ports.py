@@ -0,0 +1,153 @@
+import os
+import socket
+import time
+
+import mido as md
+import pytest
+
+from helix_ports import SerialOutport, UdpInport, UdpOutport, UDP_HEADER, UDP_MAGIC, decode_message
+
+
+#############################################################################
+############### - HELPERS - #################################################
+#############################################################################
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+def drain(inport, timeout=1.0):
+    """
+    Polls a UdpInport until the socket stays quiet.
+    """
+    out = []
+    end = time.perf_counter() + timeout
+    quiet = 0
+    while time.perf_counter() < end and quiet < 20:
+        raw = inport.poll_raw()
+        if raw is None:
+            quiet += 1
+            time.sleep(0.005)
+        else:
+            quiet = 0
+            out.append(raw[:3])
+    return out
+
+
+#############################################################################
+############### - DECODING - ################################################
+#############################################################################
+
+def test_decode_like_mido():
+    for data in [[0x90, 60, 100], [0x83, 61, 40], [0xB2, 1, 64], [0xC4, 5],
+                 [0xD1, 90], [0xE0, 0, 0], [0xE0, 0, 64], [0xEF, 127, 127]]:
+        expected = md.Message.from_bytes(data)
+        msg = decode_message(data[0], data[1], data[2] if len(data) > 2 else 0, 1.5)
+        assert msg.type == expected.type
+        assert msg.time == 1.5
+        for field in ["channel", "note", "velocity", "control", "value",
+                      "pitch", "program"]:
+            if hasattr(expected, field):
+                assert getattr(msg, field) == getattr(expected, field)
+
+def test_decode_note_on_velocity_zero():
+    msg = decode_message(0x95, 60, 0)
+    assert msg.type == "note_off"
+    assert (msg.channel, msg.note, msg.velocity) == (5, 60, 0)
+
+def test_decode_other_messages():
+    assert decode_message(0xA0, 60, 10) is None
+    assert decode_message(0xF8, 0, 0) is None
+
+
+#############################################################################
+############### - SERIAL - ##################################################
+#############################################################################
+
+@pytest.mark.skipif(not hasattr(os, "openpty"), reason="needs a pty")
+def test_serial_running_status():
+    master, slave = os.openpty()
+    try:
+        port = SerialOutport(os.ttyname(slave))
+        frame = bytearray()
+        for cc in range(80, 89):
+            frame += bytes([0xB0, cc, 64])
+        port.send_bytes(frame)
+        # A real-time byte in between keeps running status.
+        port.send_bytes([0xF8, 0xB0, 89, 1, 0xB1, 89, 1, 0xB1, 90, 2])
+        received = os.read(master, 1024)
+        assert received[:19] == bytes([0xB0] + [b for b in frame if b < 0x80])
+        assert received[19:] == bytes([0xF8, 89, 1, 0xB1, 89, 1, 90, 2])
+        assert port.bytes_written == 19 + 8
+        assert port.bytes_saved == 8 + 2
+        assert port.messages == 12
+        port.close()
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+#############################################################################
+############### - UDP - #####################################################
+#############################################################################
+
+def test_udp_gap_and_late():
+    number = free_port()
+    inport = UdpInport("127.0.0.1", number)
+    outport = UdpOutport("127.0.0.1", number)
+    try:
+        outport.send_bytes([0x90, 60, 100])
+        outport.seq = 4
+        outport.send_bytes([0x80, 60, 0])
+        outport.seq = 2
+        outport.send_bytes([0x90, 61, 100])
+        outport.send_bytes([0xB0, 7, 100, 8, 64])
+        assert drain(inport) == [(0x90, 60, 100), (0x80, 60, 0)]
+        assert inport.packets == 2
+        assert inport.lost == 3
+        assert inport.late == 2
+        assert inport.invalid == 0
+    finally:
+        inport.close()
+        outport.close()
+
+def test_udp_sender_restart():
+    number = free_port()
+    inport = UdpInport("127.0.0.1", number)
+    outport = UdpOutport("127.0.0.1", number)
+    try:
+        outport.seq = 5000
+        outport.send_bytes([0x90, 60, 100])
+        assert drain(inport) == [(0x90, 60, 100)]
+        # A new sender starts at 0: its stream is taken over, not dropped.
+        restarted = UdpOutport("127.0.0.1", number)
+        for note in range(200):
+            restarted.send_bytes([0x90, note % 128, 100])
+        restarted.close()
+        assert len(drain(inport)) == 200
+        assert inport.late == 0
+        assert inport.lost == 0
+        assert inport.restarts == 1
+    finally:
+        inport.close()
+        outport.close()
+
+def test_udp_invalid_data():
+    number = free_port()
+    inport = UdpInport("127.0.0.1", number)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for seq, data in enumerate([[0x90, 60, 0xC8],
+                                    [0x90, 60, 0xB0, 7, 100],
+                                    [0x90, 60, 64, 62]]):
+            sock.sendto(UDP_HEADER.pack(UDP_MAGIC, seq, 0) + bytes(data),
+                        ("127.0.0.1", number))
+        # A status byte in the data position starts the next message.
+        assert drain(inport) == [(0xB0, 7, 100), (0x90, 60, 64)]
+        assert inport.invalid == 4
+    finally:
+        inport.close()
+        sock.close()
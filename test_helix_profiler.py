@@ -0,0 +1,47 @@
+import time
+
+from helix_profiler import SamplingProfiler
+
+
+#############################################################################
+############### - HELPERS - #################################################
+#############################################################################
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+#############################################################################
+############### - PROFILER - ################################################
+#############################################################################
+
+def test_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, directory=str(tmp_path))
+    profiler.start()
+    assert profiler.running
+    busy(0.2)
+    path = profiler.stop()
+    assert not profiler.running
+    assert profiler.samples > 0
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines == profiler.collapsed()
+    counts = [int(line.rsplit(" ", 1)[1]) for line in lines]
+    assert sum(counts) == profiler.samples
+    assert counts == sorted(counts, reverse=True)
+    # Outermost function first, the sampled loop at the end.
+    assert any(line.rsplit(" ", 1)[0].endswith("test_helix_profiler.py:busy")
+               for line in lines)
+
+def test_toggle_on_request(tmp_path):
+    profiler = SamplingProfiler(interval=0.001, directory=str(tmp_path))
+    profiler.request()
+    assert profiler.requested
+    profiler.toggle()
+    assert profiler.running and not profiler.requested
+    profiler.toggle()
+    assert not profiler.running
+    assert profiler.files == 1
+    assert profiler.stop() is None
@@ -0,0 +1,51 @@
+from helix_recorder import (FlightRecorder, format_record, REC_IN, REC_OUT,
+                            REC_VOICE, REC_RESYNC, REC_STOP, STOP_REASONS)
+
+
+#############################################################################
+############### - FLIGHT RECORDER - #########################################
+#############################################################################
+
+def test_records_in_order():
+    recorder = FlightRecorder(size=8)
+    for i in range(5):
+        recorder.record(REC_OUT, 80 + i, i)
+    assert [(a, b) for t, kind, a, b, c in recorder.records()] == [
+        (80, 0), (81, 1), (82, 2), (83, 3), (84, 4)]
+
+def test_ring_wraparound():
+    recorder = FlightRecorder(size=4)
+    for i in range(10):
+        recorder.record(REC_OUT, i, i)
+    records = recorder.records()
+    # Only the newest four, oldest first.
+    assert [a for t, kind, a, b, c in records] == [6, 7, 8, 9]
+    times = [t for t, kind, a, b, c in records]
+    assert times == sorted(times)
+    assert recorder.count == 10
+
+def test_dump(tmp_path):
+    recorder = FlightRecorder(size=3, directory=str(tmp_path))
+    recorder.record(REC_IN, 0x90, 60, 100)
+    recorder.record(REC_VOICE, 0, 60, 100)
+    recorder.record(REC_OUT, 83, 100)
+    recorder.record(REC_STOP, STOP_REASONS["cc_off"])
+    recorder.request()
+    path = recorder.dump(reason="cc_off")
+    assert not recorder.requested
+    assert recorder.dumps == 1
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "# Helix adapter flight recorder, cc_off, 3 of 4 events"
+    assert [line.split(None, 1)[1] for line in lines[1:]] == [
+        "VOICE    OSC1 plays note 60 (velocity 100)",
+        "OUT      CC83 = 100",
+        "STOP     cc_off"]
+    # Times are relative to the newest record.
+    assert float(lines[-1].split()[0]) == 0.0
+    assert float(lines[1].split()[0]) <= 0.0
+
+def test_format_record():
+    assert format_record(REC_IN, 0x91, 60, 0) == "IN       91 3C 00  NOTE OFF ch2"
+    assert format_record(REC_RESYNC, 69, 0, 0) == "RESYNC   after CC69"
+    assert format_record(REC_RESYNC, 128 + 3, 0, 0) == "RESYNC   after program change 3"
@@ -0,0 +1,65 @@
+import os
+
+from functions import HelixOscillator
+from helix_status import StatusBoard, format_status, open_board
+
+
+#############################################################################
+############### - HELPERS - #################################################
+#############################################################################
+
+def board_name(tag):
+    return "helix_test_{}_{}".format(tag, os.getpid())
+
+def voices(*notes):
+    oscillators = []
+    for i, note in enumerate(notes):
+        o = HelixOscillator(80 + 5*i, 81 + 5*i, 82 + 5*i, 83 + 5*i, 84 + 5*i)
+        if note is not None:
+            o.set_note(note)
+            o.volume = 100
+        oscillators.append(o)
+    return oscillators
+
+
+#############################################################################
+############### - STATUS BOARD - ############################################
+#############################################################################
+
+def test_round_trip():
+    writer = StatusBoard(board_name("rt"), create=True)
+    reader = StatusBoard(board_name("rt"))
+    try:
+        assert format_status(reader.read()) == "Adapter not running."
+        writer.publish(voices(60, None, 67), True, 2, 5, 4, mode="poly")
+        state = reader.read()
+        assert state["running"] == 1
+        assert state["mode"] == 1
+        assert state["bypass"] == 1
+        assert state["keys"] == 2
+        assert (state["note1"], state["note2"], state["note3"]) == (60, None, 67)
+        assert (state["level1"], state["level2"], state["level3"]) == (100, 0, 100)
+        assert (state["events_in"], state["frames_out"]) == (5, 4)
+        writer.stop()
+        state = reader.read()
+        assert state["running"] == 0
+        assert state["note1"] == 60
+    finally:
+        reader.close()
+        writer.close()
+
+def test_open_board_creates_and_attaches():
+    first = open_board(board_name("open"))
+    second = open_board(board_name("open"))
+    try:
+        assert first.owner
+        assert not second.owner
+        first.publish(voices(48, 52, 55), False, 1, 1, 1, mode="mono")
+        assert second.read()["note2"] == 52
+    finally:
+        second.close()
+        first.close()
+    # The owner removed the board.
+    third = open_board(board_name("open"))
+    assert third.owner
+    third.close()